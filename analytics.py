@@ -0,0 +1,268 @@
+"""
+관리자 대시보드 통계 (시간/일 단위 미리 집계)
+
+- 원본 테이블(users, posts, comments, likes, bookmarks)을 id 순서로 "지난번 이후 새 행"만 읽어서
+  analytics_rollups 에 (단위, 구간, 지표, 차원) 별로 더함. 어디까지 읽었는지는 analytics_watermarks 에 저장
+  -> 집계 + 진행 위치 저장이 한 트랜잭션이라 중간에 죽어도 두 번 세지 않음
+- 방금 들어온 행은 SETTLE_SECONDS 지난 뒤에 셈 (먼저 id를 받은 트랜잭션이 늦게 커밋되는 경우 대비)
+  * 기준 시각은 DB 시계(SELECT NOW()) -> created_at(func.now())과 같은 시계라 앱 서버 시계가 어긋나도 안전
+  * 그래도 진행 위치를 지나간 뒤에 커밋된 행: 건너뛴 id 를 analytics_gaps 에 기억했다가
+    다음 번에 그 id 만 다시 찾아서 셈 (LATE_COMMIT_SECONDS 동안, 그 뒤엔 롤백/삭제된 것으로 보고 버림)
+- 활동 유저(active_users) = 그 구간에 글/댓글/좋아요/북마크를 남긴 서로 다른 유저 수
+  (analytics_activity 로 중복 제거, 다 센 구간은 지움)
+- 대시보드 조회는 집계 테이블의 구간 범위만 읽음 -> 전체 기록 크기와 상관없음
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+GRANULARITIES = ("hour", "day")
+BATCH_SIZE = 5000
+MAX_BATCHES_PER_RUN = 200           # 처음(과거 전체) 집계 때 한 번에 너무 오래 붙잡지 않도록
+SETTLE_SECONDS = 60
+LATE_COMMIT_SECONDS = 60 * 60       # 건너뛴 id 를 이만큼 기다려 봄
+MAX_GAP_IDS = 1000                  # 한 번에 이보다 많이 비어 있으면 (대량 롤백 등) 기억하지 않음
+ACTIVITY_KEEP_DAYS = 2              # 다 센 구간의 활동 기록은 이만큼 지나면 지움
+ANALYTICS_INTERVAL_SECONDS = 5 * 60
+
+# 원본 테이블 -> (모델, 지표 이름, 차원 컬럼, 활동으로 셀지)
+SOURCES = {
+    "users": (models.User, "signups", "provider", False),
+    "posts": (models.Post, "posts", None, True),
+    "comments": (models.Comment, "comments", None, True),
+    "likes": (models.Like, "likes", None, True),
+    "bookmarks": (models.Bookmark, "bookmarks", None, True),
+}
+METRICS = [metric for _, metric, _, _ in SOURCES.values()] + ["active_users"]
+
+
+def bucket_of(at: datetime, granularity: str):
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _watermark(db: Session, source: str):
+    wm = db.query(models.AnalyticsWatermark).filter(
+        models.AnalyticsWatermark.source == source
+    ).with_for_update().first()
+    if wm is not None:
+        return wm
+    try:
+        with db.begin_nested():
+            db.add(models.AnalyticsWatermark(source=source, last_id=0))
+    except IntegrityError:
+        pass
+    return db.query(models.AnalyticsWatermark).filter(
+        models.AnalyticsWatermark.source == source
+    ).with_for_update().one()
+
+
+def _add(db: Session, granularity: str, bucket: datetime, metric: str, dimension: str, delta: int):
+    table = models.AnalyticsRollup
+    key = (table.granularity == granularity, table.bucket == bucket,
+           table.metric == metric, table.dimension == dimension)
+    if db.query(table).filter(*key).update({table.value: table.value + delta}, synchronize_session=False):
+        return
+    try:
+        with db.begin_nested():
+            db.add(table(granularity=granularity, bucket=bucket, metric=metric, dimension=dimension, value=delta))
+    except IntegrityError:
+        # 다른 워커가 먼저 만든 경우
+        db.query(table).filter(*key).update({table.value: table.value + delta}, synchronize_session=False)
+
+
+def _new_activity(db: Session, candidates: set):
+    """처음 보는 (단위, 구간, 유저) 만 골라 기록하고 돌려줌"""
+    table = models.AnalyticsActivity
+    candidates = list(candidates)
+    seen = set()
+    for i in range(0, len(candidates), 1000):
+        part = candidates[i:i + 1000]
+        seen.update(db.execute(
+            select(table.granularity, table.bucket, table.user_id)
+            .where(tuple_(table.granularity, table.bucket, table.user_id).in_(part))
+        ).all())
+    fresh = [c for c in candidates if c not in seen]
+    try:
+        with db.begin_nested():
+            db.add_all(table(granularity=g, bucket=b, user_id=u) for g, b, u in fresh)
+        return fresh
+    except IntegrityError:
+        # 다른 원본을 처리하던 워커와 겹침: 한 줄씩 넣어 보고 들어간 것만 셈
+        inserted = []
+        for g, b, u in fresh:
+            try:
+                with db.begin_nested():
+                    db.add(table(granularity=g, bucket=b, user_id=u))
+                inserted.append((g, b, u))
+            except IntegrityError:
+                pass
+        return inserted
+
+
+def _late_rows(db: Session, source: str, columns, now: datetime):
+    """전에 건너뛴 id 중 그새 커밋된 행 (찾은 id 는 기억에서 지움, 오래된 빈 id 는 버림)"""
+    model = SOURCES[source][0]
+    table = models.AnalyticsGap
+    db.query(table).filter(
+        table.source == source, table.created_at < now - timedelta(seconds=LATE_COMMIT_SECONDS)
+    ).delete(synchronize_session=False)
+    gap_ids = list(db.scalars(select(table.row_id).where(table.source == source)))
+
+    late = []
+    for i in range(0, len(gap_ids), 1000):
+        late += db.execute(select(*columns).where(model.id.in_(gap_ids[i:i + 1000]))).all()
+    for i in range(0, len(late), 1000):
+        db.query(table).filter(
+            table.source == source, table.row_id.in_([row[0] for row in late[i:i + 1000]])
+        ).delete(synchronize_session=False)
+    return late
+
+
+# ==========================================
+# [1] 새 행만 더하기 (진행 위치 이후 + 늦게 커밋된 행)
+# ==========================================
+def process_batch(db: Session, source: str, batch_size: int = BATCH_SIZE):
+    model, metric, dimension_column, is_activity = SOURCES[source]
+    wm = _watermark(db, source)
+    now = db.execute(select(func.now())).scalar()  # created_at 과 같은 DB 시계
+
+    columns = [model.id, model.created_at]
+    columns.append(getattr(model, dimension_column) if dimension_column else model.id)
+    columns.append(model.user_id if is_activity else model.id)
+    late = _late_rows(db, source, columns, now)
+    rows = db.execute(
+        select(*columns).where(model.id > wm.last_id).order_by(model.id).limit(batch_size)
+    ).all()
+
+    cutoff = now - timedelta(seconds=SETTLE_SECONDS)
+    recent = now - timedelta(seconds=LATE_COMMIT_SECONDS)
+    counted = []
+    gaps = []
+    last_id = wm.last_id
+    processed_until = wm.processed_until
+    for row in rows:
+        row_id, created_at = row[0], row[1]
+        if created_at is not None and created_at >= cutoff:
+            break
+        # 최근 행 앞의 빈 id 는 아직 커밋 안 된 트랜잭션일 수 있음 -> 기억해 두고 다음에 다시 찾음
+        if row_id - last_id - 1 <= MAX_GAP_IDS and (created_at is None or created_at >= recent):
+            gaps += range(last_id + 1, row_id)
+        last_id = row_id
+        if created_at is None:
+            continue
+        processed_until = created_at
+        counted.append(row)
+
+    if last_id == wm.last_id and not late:
+        db.rollback()
+        return 0
+
+    counts = Counter()
+    activity = set()
+    for _, created_at, dimension, user_id in counted + [row for row in late if row[1] is not None]:
+        for granularity in GRANULARITIES:
+            bucket = bucket_of(created_at, granularity)
+            counts[(granularity, bucket, metric, (dimension or "") if dimension_column else "")] += 1
+            if is_activity and user_id is not None:
+                activity.add((granularity, bucket, user_id))
+    db.add_all(models.AnalyticsGap(source=source, row_id=row_id) for row_id in gaps)
+
+    if activity:
+        for granularity, bucket, _ in _new_activity(db, activity):
+            counts[(granularity, bucket, "active_users", "")] += 1
+    for (granularity, bucket, metric_name, dimension), delta in counts.items():
+        _add(db, granularity, bucket, metric_name, dimension, delta)
+
+    processed = sum(1 for row in rows if row[0] <= last_id)
+    wm.last_id = last_id
+    wm.processed_until = processed_until
+    db.commit()
+    return processed
+
+
+def purge_activity(db: Session):
+    # 모든 활동 원본이 지나간 구간만 지움 (처음 과거 전체를 집계하는 중에도 안전)
+    until = db.query(func.min(models.AnalyticsWatermark.processed_until)).filter(
+        models.AnalyticsWatermark.source.in_([s for s, spec in SOURCES.items() if spec[3]])
+    ).scalar()
+    if until is None:
+        return 0
+    deleted = db.query(models.AnalyticsActivity).filter(
+        models.AnalyticsActivity.bucket < bucket_of(until, "day") - timedelta(days=ACTIVITY_KEEP_DAYS)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def update_all(db: Session, max_batches: int = MAX_BATCHES_PER_RUN):
+    processed = {}
+    for source in SOURCES:
+        processed[source] = 0
+        for _ in range(max_batches):
+            count = process_batch(db, source)
+            processed[source] += count
+            if count < BATCH_SIZE:
+                break
+    purge_activity(db)
+    return processed
+
+
+def _update():
+    with SessionLocal() as db:
+        return update_all(db)
+
+
+async def run_forever():
+    while True:
+        try:
+            await run_in_threadpool(_update)
+        except Exception as e:
+            print(f"통계 집계 실패: {e}")
+        await asyncio.sleep(ANALYTICS_INTERVAL_SECONDS)
+
+
+# ==========================================
+# [2] 대시보드 조회 (집계 테이블만 읽음)
+# ==========================================
+def dashboard(db: Session, granularity: str, start: datetime, end: datetime, metrics: list[str] | None = None):
+    table = models.AnalyticsRollup
+    metrics = metrics or METRICS
+    rows = db.query(table.metric, table.dimension, table.bucket, table.value).filter(
+        table.granularity == granularity,
+        table.metric.in_(metrics),
+        table.bucket >= bucket_of(start, granularity),
+        table.bucket < end,
+    ).order_by(table.metric, table.bucket).all()
+
+    series = {metric: [] for metric in metrics}
+    totals = {metric: {} for metric in metrics}
+    for metric, dimension, bucket, value in rows:
+        series[metric].append({"bucket": bucket, "dimension": dimension, "value": value})
+        if metric != "active_users":  # 활동 유저는 구간끼리 더하면 중복이라 합계 안 냄
+            totals[metric][dimension] = totals[metric].get(dimension, 0) + value
+
+    watermarks = db.query(models.AnalyticsWatermark.source, models.AnalyticsWatermark.processed_until).all()
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "series": series,
+        "totals": {metric: dims for metric, dims in totals.items() if metric != "active_users"},
+        "up_to": {source: until for source, until in watermarks},  # 어디까지 반영됐는지
+    }
+
+
+if __name__ == "__main__":
+    # 처음 켤 때 과거 전체 집계(또는 크론): python analytics.py
+    with SessionLocal() as db:
+        print(update_all(db, max_batches=10 ** 9))
@@ -0,0 +1,354 @@
+"""
+오래된 좋아요/댓글/북마크 보관 (콜드 데이터 압축 저장)
+
+- likes / comments / bookmarks 는 최근 ARCHIVE_AFTER_DAYS 일치만 원래 테이블에 둠 -> 테이블/인덱스 크기가 일정하게 유지
+- 그보다 오래된 행은 백그라운드에서 BATCH_SIZE 개씩 옮김: (종류, 묶음 기준, 작성 월) 마다 한 덩어리로 모아 zlib 압축
+  * 좋아요/댓글은 게시글 기준, 북마크는 유저 기준으로 묶음 (각각 주로 찾는 방향)
+  * 좋아요는 양쪽에서 다 찾으므로 유저 기준으로 한 벌 더 저장 (kind "liked": 내가 좋아요 한 글)
+  * 작성 월(period)이 시간 구간 역할 -> 한 달치를 통째로 내보내거나 지울 수 있음
+  * 옮기기(보관 INSERT + 원본 DELETE)는 한 트랜잭션, 워커 여러 개는 SKIP LOCKED 로 나눠 가짐
+- 조회는 그대로 답함
+  * 개수: 원래 테이블 COUNT + archive_counts (압축 안 풂)
+  * "내가 눌렀나": 덩어리에 값 범위(min_ref~max_ref)가 있어서 해당하는 덩어리만 풀어 봄
+  * 댓글 목록/내 보관함/좋아요 목록: 원래 테이블 다음에 보관분을 이어서 보여줌
+
+(MySQL 파티션 테이블은 외래키를 쓸 수 없어서 테이블 파티션 대신 이 방식을 씀. SQLite 에서도 그대로 동작)
+"""
+import asyncio
+import json
+import sys
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+ARCHIVE_AFTER_DAYS = 180            # 이보다 오래된 행을 보관
+BATCH_SIZE = 5000                   # 한 트랜잭션에 옮길 행 수
+MAX_CHUNK_ROWS = 20000              # 덩어리 하나에 넣을 최대 행 수 (넘으면 새 덩어리)
+ARCHIVE_INTERVAL_SECONDS = 60 * 60
+MAX_BATCHES_PER_RUN = 100           # 한 번 돌 때 너무 오래 붙잡지 않도록
+
+# 종류별: 원본 모델, 묶음 기준(owner), 찾는 값(ref), 저장할 컬럼, 같이 쓰는 다른 묶음(mirror)
+KINDS = {
+    "like": {"model": models.Like, "owner": "post_id", "ref": "user_id",
+             "columns": ("id", "user_id", "post_id", "created_at"), "mirror": "liked"},
+    # 좋아요의 유저 기준 사본 (원본 모델 없음: "like" 를 옮길 때 같이 씀, 개수는 안 셈)
+    "liked": {"model": None, "owner": "user_id", "ref": "post_id",
+              "columns": ("id", "user_id", "post_id", "created_at")},
+    "comment": {"model": models.Comment, "owner": "post_id", "ref": "id",
+                "columns": ("id", "content", "user_id", "post_id", "created_at")},
+    "bookmark": {"model": models.Bookmark, "owner": "user_id", "ref": "post_id",
+                 "columns": ("id", "user_id", "post_id", "created_at")},
+}
+
+
+def _pack(rows: list[dict]):
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode(), 6)
+
+
+def _unpack(data: bytes):
+    # 저장된 그대로 (created_at 은 문자열)
+    return json.loads(zlib.decompress(data))
+
+
+def _to_row(raw: dict):
+    return {**raw, "created_at": datetime.fromisoformat(raw["created_at"])}
+
+
+def _encode(obj, columns):
+    row = {column: getattr(obj, column) for column in columns}
+    row["created_at"] = row["created_at"].isoformat()
+    return row
+
+
+def _add_count(db: Session, kind: str, post_id: int, delta: int):
+    table = models.ArchiveCount
+    updated = db.query(table).filter(table.kind == kind, table.post_id == post_id).update(
+        {table.count: table.count + delta}, synchronize_session=False
+    )
+    if updated or delta < 0:
+        return
+    try:
+        with db.begin_nested():
+            db.add(table(kind=kind, post_id=post_id, count=delta))
+    except IntegrityError:
+        # 다른 워커가 먼저 만든 경우
+        db.query(table).filter(table.kind == kind, table.post_id == post_id).update(
+            {table.count: table.count + delta}, synchronize_session=False
+        )
+
+
+# ==========================================
+# [1] 옮기기 (원본 -> 압축 덩어리)
+# ==========================================
+def archive_batch(db: Session, kind: str, cutoff: datetime, batch_size: int = BATCH_SIZE):
+    spec = KINDS[kind]
+    model = spec["model"]
+    cold = (
+        db.query(model)
+        .filter(model.created_at < cutoff)
+        .order_by(model.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not cold:
+        db.rollback()
+        return 0
+
+    per_post = {}
+    for obj in cold:
+        per_post[obj.post_id] = per_post.get(obj.post_id, 0) + 1
+    for target in [kind] + ([spec["mirror"]] if spec.get("mirror") else []):
+        _append(db, target, cold)
+
+    for post_id, count in per_post.items():
+        _add_count(db, kind, post_id, count)
+
+    db.query(model).filter(model.id.in_([obj.id for obj in cold])).delete(synchronize_session=False)
+    db.commit()
+    return len(cold)
+
+
+def _append(db: Session, kind: str, objs):
+    """(묶음 기준, 작성 월) 마다 덩어리에 이어 붙임 (덩어리가 차면 새로)"""
+    spec = KINDS[kind]
+    owner, ref = spec["owner"], spec["ref"]
+    groups = {}
+    for obj in objs:
+        key = (getattr(obj, owner), obj.created_at.strftime("%Y-%m"))
+        groups.setdefault(key, []).append(_encode(obj, spec["columns"]))
+
+    for (owner_id, period), rows in groups.items():
+        chunk = (
+            db.query(models.ArchiveChunk)
+            .filter(
+                models.ArchiveChunk.kind == kind,
+                models.ArchiveChunk.owner_id == owner_id,
+                models.ArchiveChunk.period == period,
+                models.ArchiveChunk.row_count <= MAX_CHUNK_ROWS - len(rows),
+            )
+            .with_for_update()
+            .first()
+        )
+        if chunk is not None:
+            rows = _unpack(chunk.data) + rows
+        else:
+            chunk = models.ArchiveChunk(kind=kind, owner_id=owner_id, period=period)
+            db.add(chunk)
+        rows.sort(key=lambda row: row[ref])
+        chunk.row_count = len(rows)
+        chunk.min_ref = rows[0][ref]
+        chunk.max_ref = rows[-1][ref]
+        chunk.data = _pack(rows)
+
+
+def archive_all(db: Session, days: int = ARCHIVE_AFTER_DAYS, max_batches: int = MAX_BATCHES_PER_RUN):
+    cutoff = datetime.now() - timedelta(days=days)
+    moved = {}
+    for kind, spec in KINDS.items():
+        if spec["model"] is None:  # 사본은 원본을 옮길 때 같이 써짐
+            continue
+        moved[kind] = 0
+        for _ in range(max_batches):
+            count = archive_batch(db, kind, cutoff)
+            moved[kind] += count
+            if count < BATCH_SIZE:
+                break
+    return moved
+
+
+def rebuild_mirror(db: Session, kind: str = "like"):
+    """사본(mirror)을 원본 보관분에서 다시 만듦 (사본이 생기기 전에 보관된 행 채우기용, 여러 번 돌려도 같음)"""
+    mirror = KINDS[kind]["mirror"]
+    db.query(models.ArchiveChunk).filter(models.ArchiveChunk.kind == mirror).delete(synchronize_session=False)
+    copied = 0
+    for chunk in db.query(models.ArchiveChunk).filter(models.ArchiveChunk.kind == kind).yield_per(100):
+        objs = [SimpleNamespace(**_to_row(row)) for row in _unpack(chunk.data)]
+        _append(db, mirror, objs)
+        copied += len(objs)
+    db.commit()
+    return copied
+
+
+def _archive():
+    with SessionLocal() as db:
+        return archive_all(db)
+
+
+async def run_forever():
+    while True:
+        try:
+            moved = await run_in_threadpool(_archive)
+            if any(moved.values()):
+                print(f"보관 완료: {moved}")
+        except Exception as e:
+            print(f"보관 실패: {e}")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+# ==========================================
+# [2] 조회 (원래 테이블 조회와 합쳐서 씀)
+# ==========================================
+def count_subquery(kind: str, post_id):
+    """보관된 개수 스칼라 서브쿼리 (다른 SELECT 안에 넣어서 쿼리 수를 늘리지 않음)"""
+    return func.coalesce(
+        select(models.ArchiveCount.count)
+        .where(models.ArchiveCount.kind == kind, models.ArchiveCount.post_id == post_id)
+        .scalar_subquery(),
+        0,
+    )
+
+
+def counts(db: Session, kind: str, post_ids: list[int]):
+    """post_id -> 보관된 개수"""
+    if not post_ids:
+        return {}
+    return dict(db.query(models.ArchiveCount.post_id, models.ArchiveCount.count).filter(
+        models.ArchiveCount.kind == kind, models.ArchiveCount.post_id.in_(post_ids)
+    ).all())
+
+
+def _owner_ref(kind: str, user_id: int, post_id: int):
+    values = {"user_id": user_id, "post_id": post_id}
+    return values[KINDS[kind]["owner"]], values[KINDS[kind]["ref"]]
+
+
+def _candidates(db: Session, kind: str, ref: int, owner_id: int | None = None, for_update: bool = False):
+    query = db.query(models.ArchiveChunk).filter(
+        models.ArchiveChunk.kind == kind,
+        models.ArchiveChunk.min_ref <= ref,
+        models.ArchiveChunk.max_ref >= ref,
+    )
+    if owner_id is not None:
+        query = query.filter(models.ArchiveChunk.owner_id == owner_id)
+    if for_update:
+        query = query.with_for_update()
+    return query.all()
+
+
+def may_contain(kind: str, user_id: int, post_id: int):
+    """해당 덩어리가 있는지 EXISTS 식 (상세 화면 SELECT 에 같이 넣어서 필요할 때만 압축을 풂)"""
+    owner_id, ref = _owner_ref(kind, user_id, post_id)
+    return (
+        select(models.ArchiveChunk.id)
+        .where(
+            models.ArchiveChunk.kind == kind,
+            models.ArchiveChunk.owner_id == owner_id,
+            models.ArchiveChunk.min_ref <= ref,
+            models.ArchiveChunk.max_ref >= ref,
+        )
+        .exists()
+    )
+
+
+def find(db: Session, kind: str, user_id: int, post_id: int):
+    """보관된 좋아요/북마크 한 줄 (없으면 None)"""
+    owner_id, ref = _owner_ref(kind, user_id, post_id)
+    ref_field = KINDS[kind]["ref"]
+    for chunk in _candidates(db, kind, ref, owner_id):
+        for row in _unpack(chunk.data):
+            if row[ref_field] == ref:
+                return _to_row(row)
+    return None
+
+
+def rows(db: Session, kind: str, owner_id: int, before_ref: int | None = None, limit: int | None = None):
+    """묶음 기준 하나의 보관 행들 (ref 큰 순). 댓글이면 최신순"""
+    ref_field = KINDS[kind]["ref"]
+    query = db.query(models.ArchiveChunk).filter(
+        models.ArchiveChunk.kind == kind, models.ArchiveChunk.owner_id == owner_id
+    )
+    if before_ref is not None:
+        query = query.filter(models.ArchiveChunk.min_ref < before_ref)
+
+    result = []
+    for chunk in query.order_by(models.ArchiveChunk.max_ref.desc()):
+        # 덩어리끼리 범위가 겹칠 수 있어서, 필요한 만큼 모은 뒤 마지막에 정렬
+        if limit is not None and len(result) >= limit and chunk.max_ref < result[-1][ref_field]:
+            break
+        result += [_to_row(row) for row in _unpack(chunk.data) if before_ref is None or row[ref_field] < before_ref]
+        result.sort(key=lambda row: row[ref_field], reverse=True)
+        if limit is not None:
+            result = result[:limit]
+    return result
+
+
+# ==========================================
+# [3] 보관된 행 지우기 (좋아요 취소, 댓글 삭제, 게시글 삭제)
+# ==========================================
+def _remove_from(db: Session, kind: str, chunks, match, counted: bool = True):
+    ref_field = KINDS[kind]["ref"]
+    for chunk in chunks:
+        chunk_rows = _unpack(chunk.data)
+        for i, row in enumerate(chunk_rows):
+            if not match(row):
+                continue
+            del chunk_rows[i]
+            if chunk_rows:
+                chunk.row_count = len(chunk_rows)
+                chunk.min_ref = chunk_rows[0][ref_field]
+                chunk.max_ref = chunk_rows[-1][ref_field]
+                chunk.data = _pack(chunk_rows)
+            else:
+                db.delete(chunk)
+            if counted:
+                _add_count(db, kind, row["post_id"], -1)
+            return _to_row(row)
+    return None
+
+
+def remove(db: Session, kind: str, user_id: int, post_id: int):
+    """보관된 좋아요/북마크 한 줄 삭제 -> 지운 행 (없으면 None). commit은 호출한 쪽에서"""
+    owner_id, ref = _owner_ref(kind, user_id, post_id)
+    ref_field = KINDS[kind]["ref"]
+    chunks = _candidates(db, kind, ref, owner_id, for_update=True)
+    removed = _remove_from(db, kind, chunks, lambda row: row[ref_field] == ref)
+    mirror = KINDS[kind].get("mirror")
+    if removed and mirror:
+        owner_id, ref = _owner_ref(mirror, user_id, post_id)
+        chunks = _candidates(db, mirror, ref, owner_id, for_update=True)
+        _remove_from(db, mirror, chunks, lambda row: row[KINDS[mirror]["ref"]] == ref, counted=False)
+    return removed
+
+
+def comment_post_id(db: Session, comment_id: int):
+    """보관된 댓글의 게시글 id (없으면 None). 잠그지 않고 값 범위가 맞는 덩어리만 풀어 봄"""
+    for chunk in _candidates(db, "comment", comment_id):
+        for row in _unpack(chunk.data):
+            if row["id"] == comment_id:
+                return row["post_id"]
+    return None
+
+
+def remove_comment(db: Session, post_id: int, comment_id: int):
+    """보관된 댓글 한 줄 삭제 (그 글의 덩어리만 잠금). commit은 호출한 쪽에서"""
+    chunks = _candidates(db, "comment", comment_id, post_id, for_update=True)
+    return _remove_from(db, "comment", chunks, lambda row: row["id"] == comment_id)
+
+
+def remove_post(db: Session, post_id: int):
+    """게시글 삭제 시 그 글의 보관 좋아요/댓글/개수 삭제 (보관된 북마크/좋아요 사본은 읽을 때 걸러냄)"""
+    db.query(models.ArchiveChunk).filter(
+        models.ArchiveChunk.kind.in_(["like", "comment"]),
+        models.ArchiveChunk.owner_id == post_id,
+    ).delete(synchronize_session=False)
+    db.query(models.ArchiveCount).filter(models.ArchiveCount.post_id == post_id).delete(
+        synchronize_session=False
+    )
+
+
+if __name__ == "__main__":
+    # 크론/수동 실행: python archive.py  (좋아요 사본 다시 만들기: python archive.py mirror)
+    if sys.argv[1:] == ["mirror"]:
+        with SessionLocal() as db:
+            print(rebuild_mirror(db))
+    else:
+        print(_archive())
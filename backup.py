@@ -0,0 +1,141 @@
+"""
+데이터 백업/복구 도구 (NDJSON)
+
+사용법:
+    python backup.py export -o dump.ndjson           # 전체 내보내기
+    python backup.py export -o dump.ndjson.gz -t users posts
+    python backup.py import dump.ndjson --batch-size 5000
+
+한 줄 = 한 행: {"table": "users", "row": {...}}
+"""
+import argparse
+import base64
+import gzip
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.types import DateTime, LargeBinary
+
+from database import Base, SessionLocal, engine
+import models  # noqa: F401 (테이블 등록용)
+
+# FK 순서대로 (부모 테이블 먼저)
+EXPORT_TABLES = [
+    "users",
+    "hashtags",
+    "posts",
+    "post_hashtags",
+    "post_media",
+    "comments",
+    "likes",
+    "bookmarks",
+    "follows",
+    "archive_chunks",   # 보관된 오래된 좋아요/댓글/북마크 (archive.py)
+    "archive_counts",
+]
+
+# 서버 사이드 커서에서 한 번에 가져올 행 수
+YIELD_PER = 1000
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return value
+
+
+# ==========================================
+# [내보내기] 서버 사이드 커서로 한 줄씩 (메모리 일정)
+# ==========================================
+def iter_ndjson(db: Session, tables: list[str] | None = None):
+    for name in tables or EXPORT_TABLES:
+        table = Base.metadata.tables[name]
+        stmt = (
+            select(table)
+            .order_by(*table.primary_key.columns)
+            .execution_options(yield_per=YIELD_PER)  # stream_results 자동 적용
+        )
+        for row in db.execute(stmt).mappings():
+            record = {"table": name, "row": {k: _to_json(v) for k, v in row.items()}}
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+# ==========================================
+# [가져오기] 여러 행을 묶어서 한 번에 INSERT
+# ==========================================
+def _parse_row(table, row: dict):
+    for column in table.columns:
+        value = row.get(column.name)
+        if value is not None and isinstance(column.type, DateTime):
+            row[column.name] = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column.type, LargeBinary):
+            row[column.name] = base64.b64decode(value)
+    return row
+
+
+def import_ndjson(db: Session, lines, batch_size: int = 5000):
+    counts = {}
+    batch = []
+    current = None
+
+    def flush():
+        if batch:
+            # ORM 객체/refresh 없이 Core insert + executemany (multi-row INSERT)
+            db.execute(insert(current), batch)
+            db.commit()
+            counts[current.name] = counts.get(current.name, 0) + len(batch)
+            batch.clear()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        table = Base.metadata.tables[record["table"]]
+        if table is not current or len(batch) >= batch_size:
+            flush()
+            current = table
+        batch.append(_parse_row(table, record["row"]))
+    flush()
+    return counts
+
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="인스타그램 DB NDJSON 백업/복구")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="DB -> NDJSON")
+    p_export.add_argument("-o", "--output", default="-")
+    p_export.add_argument("-t", "--tables", nargs="*", choices=EXPORT_TABLES)
+
+    p_import = sub.add_parser("import", help="NDJSON -> DB (빈 DB 기준)")
+    p_import.add_argument("input")
+    p_import.add_argument("--batch-size", type=int, default=5000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        with SessionLocal() as db, _open(args.output, "w") as out:
+            out.writelines(iter_ndjson(db, args.tables))
+    else:
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db, _open(args.input, "r") as src:
+            counts = import_ndjson(db, src, batch_size=args.batch_size)
+        for name, count in counts.items():
+            print(f"{name}: {count}건", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
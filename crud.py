@@ -1,7 +1,12 @@
-from sqlalchemy.orm import Session
+import re
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
 from passlib.context import CryptContext
-from models import User
+from models import User, Comment, Hashtag
 from schemas import UserCreate
+import archive
+import events
 
 # 비밀번호 암호화 도구 세팅
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -29,6 +34,112 @@ def create_user(db: Session, user: UserCreate):
     
     # 3. DB에 넣고 저장
     db.add(db_user)
+    db.flush()  # 유저 id를 이벤트에 넣기 위해
+    events.add(db, "user.created", user_id=db_user.id, nickname=db_user.nickname)
     db.commit()
     db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    return db_user
+
+# ==========================================
+# [기능 4] 여러 게시글의 최신 댓글 N개 + 총 개수 (한 번의 쿼리)
+# ==========================================
+def _supports_window_functions(db: Session):
+    dialect = db.get_bind().dialect
+    if dialect.name == "sqlite":
+        import sqlite3
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    if dialect.name == "mysql":
+        version = dialect.server_version_info or ()
+        return getattr(dialect, "is_mariadb", False) or version >= (8, 0)
+    return True
+
+
+def get_comment_previews(db: Session, post_ids: list[int], limit: int = 3):
+    """post_id -> {"total_count", "comments"(최신순), "next_cursor"}"""
+    post_ids = list(dict.fromkeys(post_ids))
+    previews = {
+        pid: {"post_id": pid, "total_count": 0, "comments": [], "next_cursor": None}
+        for pid in post_ids
+    }
+    if not post_ids or limit <= 0:
+        return previews
+
+    if _supports_window_functions(db):
+        # ROW_NUMBER() OVER (PARTITION BY post_id ORDER BY id DESC) 로 게시글별 상위 N개
+        rn = func.row_number().over(partition_by=Comment.post_id, order_by=Comment.id.desc()).label("rn")
+        total = func.count().over(partition_by=Comment.post_id).label("total")
+        ranked = select(Comment.id, rn, total).where(Comment.post_id.in_(post_ids)).subquery()
+        rows = db.execute(
+            select(Comment, ranked.c.total)
+            .join(ranked, ranked.c.id == Comment.id)
+            .where(ranked.c.rn <= limit)
+            .order_by(Comment.post_id, Comment.id.desc())
+        ).all()
+        for comment, count in rows:
+            previews[comment.post_id]["total_count"] = count
+            previews[comment.post_id]["comments"].append(comment)
+    else:
+        # 윈도우 함수가 없는 DB(구버전 SQLite/MySQL 5.x): 나보다 최신 댓글 수 < N 인 것만
+        newer = aliased(Comment)
+        newer_count = (
+            select(func.count())
+            .where(newer.post_id == Comment.post_id, newer.id > Comment.id)
+            .scalar_subquery()
+        )
+        comments = db.execute(
+            select(Comment)
+            .where(Comment.post_id.in_(post_ids), newer_count < limit)
+            .order_by(Comment.post_id, Comment.id.desc())
+        ).scalars().all()
+        counts = db.execute(
+            select(Comment.post_id, func.count())
+            .where(Comment.post_id.in_(post_ids))
+            .group_by(Comment.post_id)
+        ).all()
+        for comment in comments:
+            previews[comment.post_id]["comments"].append(comment)
+        for pid, count in counts:
+            previews[pid]["total_count"] = count
+
+    # 보관된 오래된 댓글도 개수에 더하고, 최신 댓글이 모자라면 보관분으로 채움 (보관분이 있는 글만)
+    for pid, count in archive.counts(db, "comment", post_ids).items():
+        preview = previews[pid]
+        preview["total_count"] += count
+        shortage = limit - len(preview["comments"])
+        if count and shortage > 0:
+            cursor = preview["comments"][-1].id if preview["comments"] else None
+            preview["comments"] += archive.rows(db, "comment", pid, before_ref=cursor, limit=shortage)
+
+    # 더 오래된 댓글이 남아 있으면 커서(가장 오래된 댓글 id)를 알려줌
+    for preview in previews.values():
+        if preview["total_count"] > len(preview["comments"]):
+            last = preview["comments"][-1]
+            preview["next_cursor"] = last["id"] if isinstance(last, dict) else last.id
+    return previews
+
+
+# ==========================================
+# [기능 5] 본문에서 해시태그 뽑기 + 없는 태그는 만들기
+# ==========================================
+HASHTAG_PATTERN = re.compile(r"#(\w{1,50})")
+
+def extract_hashtags(content: str | None):
+    if not content:
+        return []
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG_PATTERN.findall(content)))
+
+def get_or_create_hashtags(db: Session, names: list[str]):
+    if not names:
+        return []
+    existing = {tag.name: tag for tag in db.query(Hashtag).filter(Hashtag.name.in_(names))}
+    for name in names:
+        if name in existing:
+            continue
+        try:
+            with db.begin_nested():
+                existing[name] = Hashtag(name=name)
+                db.add(existing[name])
+        except IntegrityError:
+            # 다른 글이 같은 새 태그를 동시에 만든 경우: 먼저 들어간 행을 씀
+            existing[name] = db.query(Hashtag).filter(Hashtag.name == name).one()
+    return [existing[name] for name in names]
@@ -1,3 +1,4 @@
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -15,7 +16,13 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # DB 세션을 가져오는 함수 (API 만들 때 계속 쓸 예정)
-def get_db():
+def get_db(request: Request = None):
+    # /batch 안의 하위 요청이면 부모 요청의 세션을 같이 씀 (닫는 것도 부모가)
+    shared = request.scope.get("batch_db") if request is not None else None
+    if shared is not None:
+        yield shared
+        return
+
     db = SessionLocal()
     try:
         yield db
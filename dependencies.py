@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
@@ -12,6 +12,7 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
 # [도구 1] 토큰 생성 함수
 def create_access_token(data: dict):
@@ -22,12 +23,18 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 # [도구 2] 경비원 함수 (현재 로그인한 유저 찾기)
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db), request: Request = None):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="자격 증명이 유효하지 않습니다.",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # /batch 하위 요청: 부모 요청에서 한 번 확인한 유저를 그대로 씀 (JWT 해독/DB 조회 생략)
+    if request is not None and "batch_user" in request.scope:
+        if request.scope["batch_user"] is None:
+            raise credentials_exception
+        return request.scope["batch_user"]
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -39,4 +46,14 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = crud.get_user_by_email(db, email=email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+# [도구 3] 로그인 선택 (토큰이 없으면 None = 비로그인 손님)
+# 토큰이 있는데 만료/위조면 401 -> 클라이언트가 다시 로그인해야 하는 걸 알 수 있음
+def get_current_user_optional(token: str = Depends(oauth2_scheme_optional), db: Session = Depends(get_db),
+                              request: Request = None):
+    if request is not None and "batch_user" in request.scope:
+        return request.scope["batch_user"]
+    if not token:
+        return None
+    return get_current_user(token=token, db=db)
@@ -0,0 +1,201 @@
+"""
+유저/게시글 2단 캐시 (프로세스 내 LRU -> Redis -> DB)
+
+- 1단: 워커 프로세스 메모리 (LRU, 짧은 TTL) -> 네트워크도 안 탐
+- 2단: Redis (모든 워커/서버가 공유)
+- 쓰기 후 invalidate() -> 버전 +1, Redis 삭제 + pub/sub 으로 모든 워커에 "지워라" 방송
+  -> 각 워커의 listener 가 받는 즉시 자기 메모리에서 삭제
+- DB에서 읽어 채울 때는 읽기 전 버전과 같을 때만 저장 (읽는 사이에 수정+무효화가 끝났으면 옛 값을 채우지 않음)
+
+값은 ORM 객체가 아니라 dict (세션과 무관하게 어디서든 쓸 수 있게)
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+import models
+from redis_client import rd, async_client
+
+LOCAL_MAX_ITEMS = 10000
+LOCAL_TTL_SECONDS = 30
+REDIS_TTL_SECONDS = 5 * 60
+
+CHANNEL = "cache:invalidate"
+VERSION_TTL_SECONDS = 24 * 60 * 60  # 버전 키가 사라지면 "0" 으로 봄 (그 사이 읽던 값은 안 채움 -> 안전)
+
+# 버전이 그대로일 때만 저장 (읽기 시작 후 무효화가 있었으면 0)
+_FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+_fill = rd.register_script(_FILL_SCRIPT) if rd is not None else None
+
+# 캐시할 컬럼 (비밀번호 같은 건 넣지 않음)
+FIELDS = {
+    "user": ("id", "email", "nickname", "image_url", "is_admin", "provider", "created_at"),
+    "post": ("id", "content", "image_url", "images", "user_id", "created_at"),
+}
+MODELS = {"user": models.User, "post": models.Post}
+
+
+# ==========================================
+# [1단] 프로세스 내 LRU + TTL
+# ==========================================
+class LocalLRU:
+    def __init__(self, max_items: int = LOCAL_MAX_ITEMS, ttl: float = LOCAL_TTL_SECONDS):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local = LocalLRU()
+
+
+def _key(kind: str, entity_id: int):
+    return f"entity:{kind}:{entity_id}"
+
+
+def _version_key(key: str):
+    return f"{key}:ver"
+
+
+def _to_dict(kind: str, row):
+    return {field: getattr(row, field) for field in FIELDS[kind]}
+
+
+def _dumps(value: dict):
+    return json.dumps({k: v.isoformat() if isinstance(v, datetime) else v for k, v in value.items()})
+
+
+def _loads(raw: str):
+    value = json.loads(raw)
+    for k, v in value.items():
+        if k.endswith("_at") and v:
+            value[k] = datetime.fromisoformat(v)
+    return value
+
+
+# ==========================================
+# [읽기] 메모리 -> Redis -> DB 순서로 찾고, 찾은 값은 위 단계에 채움
+# ==========================================
+def get(db: Session, kind: str, entity_id: int):
+    key = _key(kind, entity_id)
+    value = local.get(key)
+    if value is not None:
+        return value
+
+    if rd is not None:
+        try:
+            raw = rd.get(key)
+            if raw is not None:
+                value = _loads(raw)
+                local.set(key, value)
+                return value
+        except Exception as e:
+            print(f"캐시 조회 실패: {e}")
+
+    version = None
+    if rd is not None:
+        try:
+            version = rd.get(_version_key(key)) or "0"
+        except Exception as e:
+            print(f"캐시 조회 실패: {e}")
+
+    row = db.get(MODELS[kind], entity_id)
+    if row is None:
+        return None
+    value = _to_dict(kind, row)
+    # 메모리에 먼저 넣고 버전 확인 -> 확인 뒤에 온 무효화 방송은 이 값을 지움
+    local.set(key, value)
+    if version is not None:
+        try:
+            if not _fill(keys=[key, _version_key(key)], args=[version, _dumps(value), REDIS_TTL_SECONDS]):
+                local.delete(key)  # 읽는 사이 수정됨: 이번 값은 캐시하지 않음
+        except Exception as e:
+            print(f"캐시 저장 실패: {e}")
+    return value
+
+
+def get_user(db: Session, user_id: int):
+    return get(db, "user", user_id)
+
+
+def get_post(db: Session, post_id: int):
+    return get(db, "post", post_id)
+
+
+# ==========================================
+# [무효화] 반드시 commit 뒤에 호출
+# ==========================================
+def invalidate(kind: str, entity_id: int):
+    key = _key(kind, entity_id)
+    if rd is not None:
+        try:
+            pipe = rd.pipeline()
+            pipe.incr(_version_key(key))
+            pipe.expire(_version_key(key), VERSION_TTL_SECONDS)
+            pipe.delete(key)
+            pipe.publish(CHANNEL, key)
+            pipe.execute()
+        except Exception as e:
+            print(f"캐시 무효화 실패: {e}")
+    # 버전을 올린 뒤에 지움 (그 전에 채우던 요청은 버전 확인에서 걸러짐)
+    local.delete(key)
+
+
+async def run_invalidation_listener():
+    """다른 워커/서버에서 보낸 무효화 방송을 받아 내 메모리에서 삭제"""
+    if rd is None:
+        return
+    while True:
+        client = async_client()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            # 끊겨 있는 동안 놓친 방송이 있을 수 있으니 (재)구독 때마다 한 번 비움
+            local.clear()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    local.delete(message["data"])
+        except Exception as e:
+            print(f"캐시 무효화 구독 끊김: {e}")
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+        await asyncio.sleep(1)
@@ -0,0 +1,291 @@
+"""
+도메인 이벤트 버스 (트랜잭셔널 아웃박스 + Redis Streams)
+
+1. 라우터: 쓰기와 같은 트랜잭션에서 outbox_events 에 이벤트 한 줄 추가 (add)
+2. 릴레이: 백그라운드에서 아직 안 보낸 이벤트를 Redis Stream 으로 XADD 후 published_at 표시
+3. 컨슈머: 작업(캐시/카운터/랭킹 등)마다 컨슈머 그룹을 만들어 XREADGROUP -> 처리 -> XACK
+
+- 최소 1회 전달: XADD 후 표시 전에 죽으면 다시 보냄 -> 핸들러는 중복에 안전해야 함 (event["id"] 사용)
+  - Redis에 쓰는 핸들러: seen_key 를 부작용과 같은 Lua 안에서 SET NX
+  - DB에 쓰는 핸들러: claim() 으로 처리 기록을 결과와 같은 트랜잭션에 넣음
+- 재처리: 그룹 커서를 되돌리거나(replay_group), 아웃박스 행을 다시 대기 상태로(replay_outbox)
+- 계속 실패하는 메시지: MAX_DELIVERIES 번 전달돼도 실패하면 dead-letter 스트림으로 옮기고 ACK
+  (한 메시지가 막혀도 같은 묶음의 나머지는 처리됨)
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+from redis_client import rd
+
+STREAM_KEY = "events"
+DEAD_STREAM_KEY = "events:dead"     # 계속 실패한 메시지 (그룹/에러와 같이 보관, 확인 후 replay_outbox 등으로 재처리)
+STREAM_MAXLEN = 100000              # 스트림은 최근 10만 건 정도만 보관 (근사 trim)
+
+RELAY_BATCH = 500
+RELAY_INTERVAL_SECONDS = 1
+OUTBOX_RETENTION_DAYS = 7           # 전달 끝난 아웃박스 행 보관 기간
+
+CONSUMER_BLOCK_MS = 5000
+CONSUMER_BATCH = 100
+CLAIM_IDLE_MS = 60 * 1000           # 1분 넘게 ACK 안 된 메시지는 다른 컨슈머가 가져감
+SEEN_TTL_SECONDS = 24 * 60 * 60     # 중복 전달 걸러내기 표시 보관 기간
+MAX_DELIVERIES = 5                  # 이만큼 전달돼도 실패하면 dead-letter 로
+
+CONSUMER_NAME = f"{socket.gethostname()}-{os.getpid()}"
+
+GROUPS = set()                      # consumer() 로 등록된 그룹 (재처리할 수 있는 그룹)
+
+
+# ==========================================
+# [1] 이벤트 기록 (commit은 호출한 쪽에서)
+# ==========================================
+def add(db: Session, event_type: str, **payload):
+    db.add(models.OutboxEvent(
+        event_type=event_type,
+        payload=json.dumps(payload, default=str, ensure_ascii=False),
+    ))
+
+
+# ==========================================
+# [2] 릴레이: 아웃박스 -> Redis Stream
+# ==========================================
+def relay_once(db: Session, batch_size: int = RELAY_BATCH):
+    # 워커가 여러 개여도 같은 행을 동시에 집지 않도록 SKIP LOCKED (MySQL 8)
+    pending = (
+        db.query(models.OutboxEvent)
+        .filter(models.OutboxEvent.published_at.is_(None))
+        .order_by(models.OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not pending:
+        db.rollback()
+        return 0
+
+    pipe = rd.pipeline(transaction=False)
+    for event in pending:
+        pipe.xadd(
+            STREAM_KEY,
+            {
+                "id": event.id,
+                "type": event.event_type,
+                "payload": event.payload,
+                "at": event.created_at.isoformat() if event.created_at else "",
+            },
+            maxlen=STREAM_MAXLEN,
+            approximate=True,
+        )
+    pipe.execute()
+
+    now = datetime.now()
+    for event in pending:
+        event.published_at = now
+    db.commit()
+    return len(pending)
+
+
+def purge_published(db: Session, days: int = OUTBOX_RETENTION_DAYS):
+    cutoff = datetime.now() - timedelta(days=days)
+    deleted = (
+        db.query(models.OutboxEvent)
+        .filter(models.OutboxEvent.published_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.query(models.ProcessedEvent).filter(models.ProcessedEvent.created_at < cutoff).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    return deleted
+
+
+def _relay_until_empty():
+    with SessionLocal() as db:
+        while relay_once(db) == RELAY_BATCH:
+            pass
+
+
+async def run_relay():
+    if rd is None:
+        return
+    last_purge = 0.0
+    while True:
+        try:
+            await run_in_threadpool(_relay_until_empty)
+            if time.time() - last_purge > 60 * 60:
+                with SessionLocal() as db:
+                    await run_in_threadpool(purge_published, db)
+                last_purge = time.time()
+        except Exception as e:
+            print(f"이벤트 릴레이 실패: {e}")
+        await asyncio.sleep(RELAY_INTERVAL_SECONDS)
+
+
+# ==========================================
+# [3] 컨슈머 그룹
+# ==========================================
+def ensure_group(group: str, start_id: str = "$"):
+    try:
+        rd.xgroup_create(STREAM_KEY, group, id=start_id, mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):  # 이미 있으면 통과
+            raise
+
+
+def _decode(fields: dict):
+    return {
+        "id": int(fields["id"]),
+        "type": fields["type"],
+        "payload": json.loads(fields["payload"]),
+        "at": datetime.fromisoformat(fields["at"]) if fields.get("at") else None,
+    }
+
+
+def seen_key(group: str, event: dict):
+    """중복 전달 걸러내기용 키. 핸들러의 부작용과 같은 원자 연산(Lua 등) 안에서 SET NX 해야 함
+    (처리 전에 먼저 표시하면, 처리가 실패해 다시 전달될 때 이벤트가 버려짐)"""
+    return f"events:seen:{group}:{event['id']}"
+
+
+def claim(db: Session, group: str, event: dict):
+    """DB에 결과를 쓰는 핸들러용: 처리 기록을 세션에 추가 (commit은 결과와 같이)
+    이미 처리한 이벤트면 False. 처리가 실패해 롤백되면 기록도 같이 사라짐 -> 다시 전달될 때 처리됨"""
+    try:
+        with db.begin_nested():
+            db.add(models.ProcessedEvent(consumer=group, event_id=event["id"]))
+        return True
+    except IntegrityError:
+        return False
+
+
+def clear_seen(group: str, db: Session | None = None):
+    deleted = 0
+    for key in rd.scan_iter(match=f"events:seen:{group}:*", count=1000):
+        deleted += rd.delete(key)
+    if db is not None:
+        deleted += db.query(models.ProcessedEvent).filter(models.ProcessedEvent.consumer == group).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    return deleted
+
+
+def consume_once(group: str, handler, consumer: str = CONSUMER_NAME, block_ms: int = CONSUMER_BLOCK_MS):
+    # 1. 다른 컨슈머가 받아놓고 죽은 메시지 먼저 회수
+    _, messages, *_ = rd.xautoclaim(
+        STREAM_KEY, group, consumer, min_idle_time=CLAIM_IDLE_MS, start_id="0-0", count=CONSUMER_BATCH
+    )
+    # 2. 새 메시지
+    if not messages:
+        response = rd.xreadgroup(group, consumer, {STREAM_KEY: ">"}, count=CONSUMER_BATCH, block=block_ms)
+        messages = response[0][1] if response else []
+
+    handled = 0
+    for message_id, fields in messages:
+        if not fields:  # 이미 trim 돼서 내용이 없는 메시지
+            rd.xack(STREAM_KEY, group, message_id)
+            continue
+        try:
+            handler(_decode(fields))
+        except Exception as e:
+            # ACK 안 함 -> CLAIM_IDLE_MS 뒤 다시 처리. 너무 여러 번 실패했으면 dead-letter 로
+            print(f"[{group}] 이벤트 처리 실패 ({message_id}): {e}")
+            _dead_letter_if_exhausted(group, message_id, fields, e)
+            continue
+        rd.xack(STREAM_KEY, group, message_id)
+        handled += 1
+    return handled
+
+
+def _dead_letter_if_exhausted(group: str, message_id: str, fields: dict, error: Exception):
+    pending = rd.xpending_range(STREAM_KEY, group, min=message_id, max=message_id, count=1)
+    if not pending or pending[0]["times_delivered"] < MAX_DELIVERIES:
+        return
+    pipe = rd.pipeline()
+    pipe.xadd(DEAD_STREAM_KEY, {**fields, "group": group, "message_id": message_id, "error": str(error)[:500]},
+              maxlen=STREAM_MAXLEN, approximate=True)
+    pipe.xack(STREAM_KEY, group, message_id)
+    pipe.execute()
+
+
+def consumer(group: str, handler):
+    """main.py 백그라운드 작업 목록에 넣을 코루틴 함수를 만들어 줌"""
+    GROUPS.add(group)
+
+    async def run_forever():
+        if rd is None:
+            return
+        await run_in_threadpool(ensure_group, group)
+        while True:
+            try:
+                await run_in_threadpool(consume_once, group, handler)
+            except Exception as e:
+                print(f"[{group}] 이벤트 처리 실패: {e}")
+                await asyncio.sleep(1)
+    run_forever.__name__ = f"consume_{group}"
+    return run_forever
+
+
+# ==========================================
+# [4] 재처리 / 지표
+# ==========================================
+def replay_group(group: str, from_id: str = "0", reset_seen: bool = False, db: Session | None = None):
+    """그룹 커서를 되돌려 스트림에 남아 있는 이벤트부터 다시 처리
+    reset_seen=False 면 이미 처리한 이벤트는 건너뜀, True 면 중복 표시를 지우고 전부 다시 적용 (Redis 데이터를 잃었을 때)
+    등록 안 된 그룹이면 ValueError (오타로 아무도 안 읽는 새 그룹이 생기지 않도록)"""
+    if group not in GROUPS:
+        raise ValueError(f"없는 컨슈머 그룹입니다: {group}")
+    ensure_group(group, start_id=from_id)
+    if reset_seen:
+        clear_seen(group, db)
+    rd.xgroup_setid(STREAM_KEY, group, id=from_id)
+
+
+def replay_outbox(db: Session, since_event_id: int):
+    """스트림에서 잘려나간 옛 이벤트는 아웃박스에서 다시 발행 (모든 그룹이 다시 받음)"""
+    count = (
+        db.query(models.OutboxEvent)
+        .filter(models.OutboxEvent.id >= since_event_id)
+        .update({models.OutboxEvent.published_at: None}, synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
+def stats(db: Session):
+    backlog, oldest = db.query(
+        func.count(models.OutboxEvent.id), func.min(models.OutboxEvent.created_at)
+    ).filter(models.OutboxEvent.published_at.is_(None)).one()
+
+    result = {
+        "outbox_backlog": backlog,
+        "outbox_oldest_seconds": (datetime.now() - oldest).total_seconds() if oldest else 0,
+        "stream_length": 0,
+        "dead_letters": 0,
+        "groups": [],
+    }
+    if rd is None or not rd.exists(STREAM_KEY):
+        return result
+
+    result["stream_length"] = rd.xlen(STREAM_KEY)
+    result["dead_letters"] = rd.xlen(DEAD_STREAM_KEY)
+    for group in rd.xinfo_groups(STREAM_KEY):
+        result["groups"].append({
+            "name": group["name"],
+            "consumers": group["consumers"],
+            "pending": group["pending"],           # 받았지만 ACK 안 된 수
+            "lag": group.get("lag"),               # 아직 안 받은 수 (Redis 7+)
+            "last_delivered_id": group["last-delivered-id"],
+        })
+    return result
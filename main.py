@@ -1,28 +1,63 @@
-from fastapi import FastAPI, Response, status
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from database import engine
 import models
-import redis
-from routers import users, posts, comments, likes, bookmarks, follows, admin, search, auth
+import analytics
+import archive
+import entity_cache
+import events
+import notifier
+import profiling
+import ranking
+import static_assets
+import suggestions
+import typeahead
+import uploads
+from redis_client import rd
+from routers import users, posts, comments, likes, bookmarks, follows, admin, search, auth, notifications, batch, upload_tickets
 
 # 1. 데이터베이스 테이블 생성
 models.Base.metadata.create_all(bind=engine)
 
-# 2. FastAPI 앱 실행 (이게 먼저 나와야 @app을 쓸 수 있음)
-app = FastAPI(title="인스타그램 API", version="1.0.0")
+# 느린 쿼리 기록 (SLOW_QUERY_MS 환경변수, 기본 200ms)
+profiling.install_sql_hooks(engine)
 
-# 3. Redis 연결 설정 (필수 요건)
-# (Docker로 띄운 Redis에 접속 시도)
-try:
-    # decode_responses=True를 하면 데이터가 byte가 아니라 string으로 나옴
-    rd = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-except Exception as e:
-    print(f"Redis 연결 에러: {e}")
-    rd = None
+# 2. 백그라운드 작업 (서버 켜질 때 시작, 꺼질 때 정리)
+BACKGROUND_JOBS = [
+    events.run_relay,                                  # 아웃박스 -> Redis Stream
+    entity_cache.run_invalidation_listener,            # 다른 워커의 캐시 무효화 방송 수신
+    profiling.run_config_sync,                         # 관리자가 켠 프로파일링 대상 동기화
+    events.consumer("ranking", ranking.handle_event),  # 탐색 탭 인기 점수 갱신
+    events.consumer("notifications", notifier.handle_event),  # 좋아요/댓글/팔로우 알림 생성
+    events.consumer("typeahead", typeahead.handle_event),      # 자동완성 접두어 인덱스 갱신
+    typeahead.run_rebuild_if_missing,                  # Redis가 비어 있으면 자동완성 인덱스 재구성
+    ranking.run_forever,                               # 탐색 탭 인기 점수 정리
+    suggestions.run_forever,                           # 팔로우 추천 배치 계산 (워커 중 한 곳만)
+    uploads.run_gc,                                    # 참조 없는 업로드 파일 청소
+    archive.run_forever,                               # 오래된 좋아요/댓글/북마크 압축 보관
+    analytics.run_forever,                             # 관리자 통계 시간/일 단위 집계 (새 행만)
+]
 
-# 4. 사진 폴더 개방
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 정적 파일(html/css/js) 미리 압축 (바뀐 것만)
+    await run_in_threadpool(static_assets.precompress, static_assets.STATIC_DIR)
+
+    tasks = [asyncio.create_task(job()) for job in BACKGROUND_JOBS]
+    yield
+    for task in tasks:
+        task.cancel()
+
+# FastAPI 앱 실행 (이게 먼저 나와야 @app을 쓸 수 있음)
+app = FastAPI(title="인스타그램 API", version="1.0.0", lifespan=lifespan)
+
+# 3. Redis 연결 설정 (필수 요건) -> redis_client.py 에서 만들어서 같이 씀
+
+# 4. 사진 폴더 개방 (미리 압축 + 해시 주소는 영구 캐시)
+static_files = static_assets.AssetFiles(directory=static_assets.STATIC_DIR)
+app.mount(static_assets.STATIC_URL, static_files, name="static")
 
 # 5. 라우터(기능들) 등록
 app.include_router(users.router)
@@ -34,14 +69,17 @@ app.include_router(follows.router)
 app.include_router(admin.router)
 app.include_router(search.router)
 app.include_router(auth.router)
+app.include_router(notifications.router)
+app.include_router(batch.router)
+app.include_router(upload_tickets.router)
 
 # ==========================================
 # [기본 API] 서버 생존 확인
 # ==========================================
 @app.get("/")
-def read_root():
-    # static 폴더 안에 있는 index.html 파일을 사용자에게 전송
-    return FileResponse("static/index.html")
+async def read_root(request: Request):
+    # static 폴더 안에 있는 index.html 파일을 사용자에게 전송 (압축본 + 304 재검증)
+    return await static_files.get_response("index.html", request.scope)
 
 # ==========================================
 # [추가 API] 서버 상태 체크 + 방문자 카운트
@@ -68,4 +106,10 @@ def health_check(response: Response):
     except Exception:
         # Redis가 꺼져있거나 연결 안 되면 503 에러 리턴
         response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-        return {"status": "error", "detail": "Redis 서버에 연결할 수 없습니다."}
\ No newline at end of file
+        return {"status": "error", "detail": "Redis 서버에 연결할 수 없습니다."}
+
+
+# 관리자가 켰을 때만 동작하는 요청 프로파일링 (꺼져 있으면 거의 비용 없음)
+# 모든 라우트 등록이 끝난 뒤에 호출해야 함 (위의 / , /health 포함)
+profiling.instrument(app)
+app.add_middleware(profiling.ProfilingMiddleware)
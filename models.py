@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, Boolean, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -52,7 +52,7 @@ class Post(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text)                               # 본문
-    image_url = Column(String(255))                      # 사진 (1장)
+    image_url = Column(String(255))                      # 사진 (여러 장이면 첫 장 = 대표 사진)
     user_id = Column(Integer, ForeignKey("users.id"))    # 작성자
     created_at = Column(DateTime, default=func.now())    # 작성일
     
@@ -64,6 +64,14 @@ class Post(Base):
     # 해시태그 관계 설정
     hashtags = relationship("Hashtag", secondary=post_hashtags, back_populates="posts")
 
+    # 여러 장 게시글의 사진 (순서대로). 목록에서는 selectinload 로 IN 쿼리 한 번에 불러옴
+    media = relationship("PostMedia", order_by="PostMedia.position", cascade="all, delete-orphan")
+
+    @property
+    def images(self):
+        # 1장짜리 글은 image_url 만 있음
+        return [m.image_url for m in self.media] or ([self.image_url] if self.image_url else [])
+
 # [5] 댓글 테이블
 class Comment(Base):
     __tablename__ = "comments"
@@ -108,4 +116,149 @@ class Hashtag(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, index=True) # 태그명 (예: #여행)
 
-    posts = relationship("Post", secondary=post_hashtags, back_populates="hashtags")
\ No newline at end of file
+    posts = relationship("Post", secondary=post_hashtags, back_populates="hashtags")
+
+# [9] 이벤트 아웃박스 (쓰기와 같은 트랜잭션에 저장 -> Redis Streams로 전달)
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(50))                      # 예: like.created
+    payload = Column(Text)                               # JSON
+    created_at = Column(DateTime, default=func.now())
+    published_at = Column(DateTime, nullable=True, index=True)  # 전달 완료 시각 (NULL = 대기 중)
+
+
+# [10] 업로드 파일 (내용 해시로 저장 -> 같은 사진은 한 번만, 참조 수로 관리)
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)        # 내용 해시 (= 파일 이름)
+    size = Column(Integer)
+    content_type = Column(String(50))                    # 파일 내용으로 판별한 타입
+    storage = Column(String(20), default="LOCAL")        # 저장소 (LOCAL, CLOUDINARY)
+    storage_key = Column(String(255))                    # 로컬 경로 또는 Cloudinary public_id
+    url = Column(String(255), unique=True, index=True)   # 게시글/프로필에 저장되는 주소
+    ref_count = Column(Integer, default=0)               # 이 파일을 쓰는 곳의 수 (0이면 청소 대상)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+
+# [11] 알림 (좋아요/댓글/팔로우) - 읽기 전 같은 종류는 한 줄로 묶음 ("X님 외 41명")
+class Notification(Base):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_coalesce", "user_id", "is_read", "type", "post_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # (게시글/유저가 지워져도 삭제가 막히지 않도록 FK는 걸지 않음)
+    user_id = Column(Integer)                    # 받는 사람
+    type = Column(String(20))                    # like, comment, follow
+    post_id = Column(Integer, nullable=True)     # 팔로우는 없음
+    actor_id = Column(Integer)                   # 가장 최근에 한 사람
+    actor_count = Column(Integer, default=1)     # 묶인 서로 다른 사람 수 (notification_actors)
+    is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+# [12] 보관(콜드) 데이터 - 오래된 좋아요/댓글/북마크를 월별로 묶어 압축 저장 (archive.py)
+class ArchiveChunk(Base):
+    __tablename__ = "archive_chunks"
+    __table_args__ = (
+        Index("ix_archive_chunks_owner", "kind", "owner_id", "period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20))                    # like, comment, bookmark
+    owner_id = Column(Integer)                   # 묶는 기준 (좋아요/댓글: post_id, 북마크: user_id)
+    period = Column(String(7))                   # 작성 월 (예: 2025-01) -> 시간 구간 단위
+    row_count = Column(Integer, default=0)
+    min_ref = Column(Integer)                    # 찾을 때 쓰는 값의 범위
+    max_ref = Column(Integer)                    # (좋아요: user_id, 댓글: 댓글 id, 북마크: post_id)
+    data = Column(LargeBinary(length=2 ** 24))   # zlib 압축 JSON (MEDIUMBLOB)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+# [13] 보관된 행 수 (게시글별) -> 개수는 압축을 풀지 않고 바로 더함
+class ArchiveCount(Base):
+    __tablename__ = "archive_counts"
+
+    kind = Column(String(20), primary_key=True)
+    post_id = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0)
+
+
+# [14] 통계 집계 (관리자 대시보드) - 시간/일 단위로 미리 더해 둔 값 (analytics.py)
+class AnalyticsRollup(Base):
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        Index("ix_analytics_rollups_metric", "granularity", "metric", "bucket"),
+    )
+
+    granularity = Column(String(10), primary_key=True)   # hour, day
+    bucket = Column(DateTime, primary_key=True)          # 구간 시작 시각
+    metric = Column(String(30), primary_key=True)        # signups, posts, comments, likes, bookmarks, active_users
+    dimension = Column(String(30), primary_key=True, default="")  # 가입경로 등 (없으면 "")
+    value = Column(Integer, default=0)
+
+
+# [15] 통계 집계 진행 위치 (테이블별로 어디까지 더했는지)
+class AnalyticsWatermark(Base):
+    __tablename__ = "analytics_watermarks"
+
+    source = Column(String(30), primary_key=True)        # 원본 테이블 이름
+    last_id = Column(Integer, default=0)
+    processed_until = Column(DateTime, nullable=True)    # 마지막으로 더한 행의 작성 시각
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+# [16] 활동 유저 중복 제거용 (구간별로 한 번만 세기 위해, 최근 며칠치만 보관)
+class AnalyticsActivity(Base):
+    __tablename__ = "analytics_activity"
+
+    granularity = Column(String(10), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+
+
+# [17] 게시글 사진 (여러 장 게시글, position 순서대로 보여줌)
+class PostMedia(Base):
+    __tablename__ = "post_media"
+    __table_args__ = (
+        Index("ix_post_media_post", "post_id", "position", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"))
+    position = Column(Integer)                           # 0부터 (0 = 대표 사진)
+    image_url = Column(String(255))                      # Blob.url (장마다 참조 수 +1)
+
+
+# [18] 처리한 이벤트 (DB에 결과를 쓰는 컨슈머의 중복 걸러내기, 결과와 같은 트랜잭션에 기록)
+class ProcessedEvent(Base):
+    __tablename__ = "processed_events"
+
+    consumer = Column(String(30), primary_key=True)      # 컨슈머 그룹 이름
+    event_id = Column(Integer, primary_key=True)         # outbox_events.id
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+
+# [19] 묶인 알림에 들어간 사람 (같은 사람이 좋아요 -> 취소 -> 좋아요 해도 한 번만 셈)
+class NotificationActor(Base):
+    __tablename__ = "notification_actors"
+
+    notification_id = Column(Integer, primary_key=True)
+    actor_id = Column(Integer, primary_key=True)
+
+
+# [20] 통계 집계 때 건너뛴 id (먼저 id를 받고 늦게 커밋되는 행을 나중에 한 번만 세기 위해, 잠시만 보관)
+class AnalyticsGap(Base):
+    __tablename__ = "analytics_gaps"
+
+    source = Column(String(30), primary_key=True)        # 원본 테이블 이름
+    row_id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=func.now())
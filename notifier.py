@@ -0,0 +1,172 @@
+"""
+알림 (좋아요/댓글/팔로우)
+
+- 라우터가 남긴 이벤트(events.py)를 "notifications" 컨슈머 그룹이 받아서 알림 행을 만듦 (요청 경로 밖)
+- 중복 전달: 처리 기록(processed_events)을 알림과 같은 트랜잭션에 commit -> 실패하면 같이 롤백되어 다시 처리됨
+- 묶기: 아직 안 읽은 같은 종류(같은 게시글의 좋아요 등)가 있으면 새 행 대신 actor_count + 1
+  (처음 묶이는 사람일 때만, notification_actors 로 확인)
+  -> "X님 외 41명이 회원님의 게시글을 좋아합니다." 한 줄
+- 안 읽은 개수는 Redis에 캐시 (바뀌면 지우고, 읽을 때 다시 계산)
+- 실시간: Redis pub/sub 채널 notif:{user_id} 로 발행 -> SSE 연결이 받아서 전달
+  같은 묶음은 PUSH_COALESCE_MS 안에 한 번만 발행 (인기 글 좋아요 폭주 방지)
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import entity_cache
+import events
+import models
+from database import SessionLocal
+from redis_client import rd
+
+UNREAD_KEY = "notif:unread:{}"
+CHANNEL = "notif:{}"
+PUSH_THROTTLE_KEY = "notif:push:{}:{}:{}"
+
+UNREAD_TTL_SECONDS = 60 * 60
+PUSH_COALESCE_MS = 2000
+
+MESSAGES = {
+    "like": "회원님의 게시글을 좋아합니다.",
+    "comment": "회원님의 게시글에 댓글을 남겼습니다.",
+    "follow": "회원님을 팔로우하기 시작했습니다.",
+}
+
+
+# ==========================================
+# [1] 이벤트 -> 알림 (컨슈머 그룹: notifications)
+# ==========================================
+NOTIFY_EVENTS = {"like.created", "comment.created", "follow.created"}
+
+
+def handle_event(event: dict):
+    if event["type"] not in NOTIFY_EVENTS:
+        return
+    payload = event["payload"]
+    with SessionLocal() as db:
+        if not events.claim(db, "notifications", event):
+            return  # 이미 처리한 이벤트
+        if event["type"] == "like.created":
+            post = entity_cache.get_post(db, payload["post_id"])
+            if post:
+                notify(db, post["user_id"], "like", payload["user_id"], payload["post_id"])
+        elif event["type"] == "comment.created":
+            notify(db, payload["post_owner_id"], "comment", payload["user_id"], payload["post_id"])
+        elif event["type"] == "follow.created":
+            notify(db, payload["following_id"], "follow", payload["follower_id"])
+
+
+def notify(db: Session, user_id: int, type: str, actor_id: int, post_id: int | None = None):
+    if user_id == actor_id:
+        return None  # 내 글에 내가 한 건 알림 없음
+
+    # 받는 사람 행을 잠가서 같은 사람 알림은 컨슈머 여러 개가 차례대로 처리
+    # (안 읽은 알림이 없을 때는 아래 FOR UPDATE 가 잠글 행이 없어서 둘 다 새로 만들 수 있음)
+    db.query(models.User.id).filter(models.User.id == user_id).with_for_update().first()
+    existing = (
+        db.query(models.Notification)
+        .filter(
+            models.Notification.user_id == user_id,
+            models.Notification.is_read.is_(False),
+            models.Notification.type == type,
+            models.Notification.post_id == post_id,
+        )
+        .order_by(models.Notification.id.desc())
+        .with_for_update()
+        .first()
+    )
+    if existing:
+        if _add_actor(db, existing.id, actor_id):
+            existing.actor_count = models.Notification.actor_count + 1
+        existing.actor_id = actor_id
+        existing.updated_at = datetime.now()
+        notification = existing
+    else:
+        notification = models.Notification(user_id=user_id, type=type, post_id=post_id, actor_id=actor_id)
+        db.add(notification)
+        db.flush()
+        _add_actor(db, notification.id, actor_id)
+    db.commit()
+    db.refresh(notification)
+
+    if rd is not None:
+        if not existing:
+            rd.delete(UNREAD_KEY.format(user_id))
+        _publish(db, notification, force=not existing)
+    return notification
+
+
+def _add_actor(db: Session, notification_id: int, actor_id: int):
+    """이 알림에 처음 묶이는 사람이면 True"""
+    try:
+        with db.begin_nested():
+            db.add(models.NotificationActor(notification_id=notification_id, actor_id=actor_id))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _publish(db: Session, notification: models.Notification, force: bool):
+    throttle_key = PUSH_THROTTLE_KEY.format(notification.user_id, notification.type, notification.post_id)
+    acquired = rd.set(throttle_key, 1, nx=True, px=PUSH_COALESCE_MS)
+    if not (acquired or force):
+        return
+    message = {
+        "notification": to_response(db, notification),
+        "unread_count": unread_count(db, notification.user_id),
+    }
+    rd.publish(CHANNEL.format(notification.user_id), json.dumps(message, default=str, ensure_ascii=False))
+
+
+# ==========================================
+# [2] 조회용
+# ==========================================
+def to_response(db: Session, notification: models.Notification):
+    actor = entity_cache.get_user(db, notification.actor_id)
+    nickname = actor["nickname"] if actor else "(알 수 없음)"
+    others = notification.actor_count - 1
+    who = f"{nickname}님 외 {others}명이" if others > 0 else f"{nickname}님이"
+    return {
+        "id": notification.id,
+        "type": notification.type,
+        "post_id": notification.post_id,
+        "actor_id": notification.actor_id,
+        "actor_nickname": nickname,
+        "actor_count": notification.actor_count,
+        "is_read": notification.is_read,
+        "updated_at": notification.updated_at,
+        "message": f"{who} {MESSAGES[notification.type]}",
+    }
+
+
+def unread_count(db: Session, user_id: int):
+    key = UNREAD_KEY.format(user_id)
+    if rd is not None:
+        cached = rd.get(key)
+        if cached is not None:
+            return int(cached)
+    count = (
+        db.query(models.Notification)
+        .filter(models.Notification.user_id == user_id, models.Notification.is_read.is_(False))
+        .count()
+    )
+    if rd is not None:
+        rd.set(key, count, ex=UNREAD_TTL_SECONDS)
+    return count
+
+
+def mark_read(db: Session, user_id: int, notification_id: int | None = None):
+    query = db.query(models.Notification).filter(
+        models.Notification.user_id == user_id, models.Notification.is_read.is_(False)
+    )
+    if notification_id is not None:
+        query = query.filter(models.Notification.id == notification_id)
+    updated = query.update({models.Notification.is_read: True}, synchronize_session=False)
+    db.commit()
+    if rd is not None:
+        rd.delete(UNREAD_KEY.format(user_id))
+    return updated
+
@@ -0,0 +1,383 @@
+"""
+요청 단위 프로파일링 + 느린 쿼리 기록 (관리자용)
+
+- 관리자가 "이 경로(또는 이 유저)의 요청 N개를 프로파일링" 을 등록 (Redis에 저장 -> 모든 워커 공유)
+- 꺼져 있을 때: 미들웨어는 빈 dict 확인 한 번, 엔드포인트 래퍼는 contextvar 조회 한 번
+- 모드
+  - cprofile: 엔드포인트가 실제로 도는 스레드에서 cProfile (함수별 누적 시간)
+  - sample:   같은 스레드의 스택을 몇 ms마다 찍어서 접힌 스택(folded) -> flamegraph.pl / speedscope 에 바로 넣기
+  - 둘 다 sync 엔드포인트만 (async 는 이벤트 루프 스레드에서 다른 요청들과 섞여 돌아서 시간/쿼리만 기록)
+- 느린 SQL: 엔진 이벤트로 시간 측정, 기준 넘으면 로그 + Redis 기록 + EXPLAIN (별도 스레드/연결에서)
+"""
+import asyncio
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import logging
+import os
+import pstats
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from jose import jwt, JWTError
+from sqlalchemy import event
+
+import dependencies
+from redis_client import rd
+
+logger = logging.getLogger("profiling")
+
+TARGETS_KEY = "profiling:targets"          # hash: 대상 id -> 설정(JSON)
+REMAINING_KEY = "profiling:remaining:{}"   # 대상별 남은 횟수 (모든 워커가 같이 깎음)
+RESULTS_KEY = "profiling:results"          # 최근 결과 (최신이 앞)
+SLOW_QUERIES_KEY = "profiling:slow_queries"
+
+MAX_RESULTS = 100
+MAX_SLOW_QUERIES = 200
+CONFIG_SYNC_SECONDS = 2
+SAMPLE_INTERVAL_SECONDS = 0.002
+TOP_FUNCTIONS = 50
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))  # 0 이하면 끔
+
+# 워커 메모리에 들고 있는 대상 목록 (백그라운드에서 주기적으로 Redis와 맞춤)
+_targets = {}
+
+# 지금 요청이 프로파일링 대상이면 여기에 기록용 dict 가 들어감 (스레드풀로도 전달됨)
+_current = contextvars.ContextVar("profiling_current", default=None)
+
+
+# ==========================================
+# [1] 대상 관리 (관리자 API에서 호출)
+# ==========================================
+def add_target(path_prefix: str | None, user_email: str | None, count: int, mode: str, sample_rate: float):
+    target_id = uuid.uuid4().hex[:8]
+    config = {
+        "id": target_id,
+        "path_prefix": path_prefix,
+        "user_email": user_email,
+        "mode": mode,
+        "sample_rate": sample_rate,
+        "count": count,
+    }
+    pipe = rd.pipeline()
+    pipe.hset(TARGETS_KEY, target_id, json.dumps(config))
+    pipe.set(REMAINING_KEY.format(target_id), count)
+    pipe.execute()
+    _targets[target_id] = config
+    return config
+
+
+def list_targets():
+    targets = [json.loads(raw) for raw in rd.hvals(TARGETS_KEY)]
+    for target in targets:
+        target["remaining"] = max(int(rd.get(REMAINING_KEY.format(target["id"])) or 0), 0)
+    return targets
+
+
+def remove_target(target_id: str):
+    pipe = rd.pipeline()
+    pipe.hdel(TARGETS_KEY, target_id)
+    pipe.delete(REMAINING_KEY.format(target_id))
+    removed, _ = pipe.execute()
+    _targets.pop(target_id, None)
+    return bool(removed)
+
+
+def _sync_targets():
+    configs = rd.hgetall(TARGETS_KEY)
+    remaining = rd.mget([REMAINING_KEY.format(target_id) for target_id in configs]) if configs else []
+    latest = {}
+    for (target_id, raw), left in zip(configs.items(), remaining):
+        if int(left or 0) <= 0:  # 다 쓴 대상은 안 들고 있음 (요청마다 DECR 하지 않게)
+            continue
+        latest[target_id] = json.loads(raw)
+    _targets.clear()
+    _targets.update(latest)
+
+
+async def run_config_sync():
+    if rd is None:
+        return
+    while True:
+        try:
+            await run_in_threadpool(_sync_targets)
+        except Exception as e:
+            print(f"프로파일링 설정 동기화 실패: {e}")
+        await asyncio.sleep(CONFIG_SYNC_SECONDS)
+
+
+# ==========================================
+# [2] 결과 조회
+# ==========================================
+def list_results(limit: int = 20):
+    summaries = []
+    for raw in rd.lrange(RESULTS_KEY, 0, limit - 1):
+        result = json.loads(raw)
+        result.pop("stats", None)
+        result.pop("folded", None)
+        summaries.append(result)
+    return summaries
+
+
+def get_result(result_id: str):
+    for raw in rd.lrange(RESULTS_KEY, 0, MAX_RESULTS - 1):
+        result = json.loads(raw)
+        if result["id"] == result_id:
+            return result
+    return None
+
+
+def list_slow_queries(limit: int = 50):
+    return [json.loads(raw) for raw in rd.lrange(SLOW_QUERIES_KEY, 0, limit - 1)]
+
+
+# ==========================================
+# [3] ASGI 미들웨어: 이 요청을 프로파일링할지 결정
+# ==========================================
+def _request_email(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            token = value.decode("latin-1").partition(" ")[2]
+            try:
+                payload = jwt.decode(token, dependencies.SECRET_KEY, algorithms=[dependencies.ALGORITHM])
+                return payload.get("sub")
+            except JWTError:
+                return None
+    return None
+
+
+def _pick_target(scope):
+    path = scope["path"]
+    email = None
+    for target in list(_targets.values()):
+        if target["path_prefix"] and not path.startswith(target["path_prefix"]):
+            continue
+        if target["user_email"]:
+            email = email or _request_email(scope)
+            if email != target["user_email"]:
+                continue
+        if random.random() >= target["sample_rate"]:
+            continue
+        # 남은 횟수를 원자적으로 하나 깎음. 마지막 1개를 썼거나 이미 끝났으면 대상에서 뺌
+        remaining = rd.decr(REMAINING_KEY.format(target["id"]))
+        if remaining <= 0:
+            remove_target(target["id"])
+        if remaining < 0:
+            continue
+        return target
+    return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _targets:
+            return await self.app(scope, receive, send)
+
+        # Redis DECR / JWT 확인은 블로킹이라 스레드에서 (대상이 켜져 있을 때만 여기까지 옴)
+        target = await run_in_threadpool(_pick_target, scope)
+        if target is None:
+            return await self.app(scope, receive, send)
+
+        record = {
+            "id": uuid.uuid4().hex[:12],
+            "target_id": target["id"],
+            "mode": target["mode"],
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": None,
+            "started_at": time.time(),
+            "queries": [],
+        }
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record["status"] = message["status"]
+            await send(message)
+
+        token = _current.set(record)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            await run_in_threadpool(_save_result, record)
+
+
+def _save_result(record: dict):
+    try:
+        pipe = rd.pipeline()
+        pipe.lpush(RESULTS_KEY, json.dumps(record, default=str))
+        pipe.ltrim(RESULTS_KEY, 0, MAX_RESULTS - 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"프로파일링 결과 저장 실패: {e}")
+
+
+# ==========================================
+# [4] 엔드포인트 래퍼: 실제로 함수가 도는 스레드에서 측정
+# ==========================================
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class _Measure:
+    def __init__(self, record: dict):
+        self.record = record
+        self.profiler = None
+        self.sampler = None
+
+    def __enter__(self):
+        if self.record["mode"] == "sample":
+            self.sampler = StackSampler(threading.get_ident())
+            self.sampler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def __exit__(self, *exc):
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.record["folded"] = "\n".join(f"{stack} {n}" for stack, n in self.sampler.counts.most_common())
+            self.record["samples"] = sum(self.sampler.counts.values())
+        else:
+            self.profiler.disable()
+            self.record["stats"] = _top_functions(self.profiler)
+        return False
+
+
+def _top_functions(profiler: cProfile.Profile):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "ncalls": nc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _wrap(call):
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            record = _current.get()
+            if record is not None:
+                # 이벤트 루프 스레드 전체를 재면 동시에 도는 다른 요청까지 섞이고, 두 요청이 겹치면 프로파일러도 덮어씀
+                record["note"] = "async 엔드포인트: 프로파일 없이 시간/쿼리만 기록"
+            return await call(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(call)
+    def sync_wrapper(*args, **kwargs):
+        record = _current.get()
+        if record is None:
+            return call(*args, **kwargs)
+        with _Measure(record):
+            return call(*args, **kwargs)
+    return sync_wrapper
+
+
+def instrument(app):
+    """등록된 모든 API 엔드포인트에 래퍼를 씌움 (라우터 등록이 끝난 뒤 호출)"""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "__wrapped__", None):
+            route.dependant.call = _wrap(route.dependant.call)
+
+
+# ==========================================
+# [5] 느린 SQL 기록 + EXPLAIN
+# ==========================================
+_explain_queue = queue.Queue(maxsize=100)
+
+
+def _explain_worker(engine):
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    while True:
+        entry = _explain_queue.get()
+        entry["plan"] = None
+        if "parameters" in entry:
+            try:
+                # 요청이 쓰던 연결과 별개의 연결에서 실행 (스트리밍 커서와 섞이지 않게)
+                with engine.connect().execution_options(profiling_explain=True) as conn:
+                    rows = conn.exec_driver_sql(prefix + entry["statement"], entry.pop("parameters")).all()
+                entry["plan"] = [list(map(str, row)) for row in rows]
+            except Exception as e:
+                entry["plan"] = [f"EXPLAIN 실패: {e}"]
+        logger.warning("느린 쿼리 %.1fms: %s\n실행 계획: %s", entry["duration_ms"], entry["statement"], entry["plan"])
+        if rd is not None:
+            try:
+                pipe = rd.pipeline()
+                pipe.lpush(SLOW_QUERIES_KEY, json.dumps(entry, default=str))
+                pipe.ltrim(SLOW_QUERIES_KEY, 0, MAX_SLOW_QUERIES - 1)
+                pipe.execute()
+            except Exception as e:
+                print(f"느린 쿼리 저장 실패: {e}")
+
+
+def install_sql_hooks(engine, slow_query_ms: float = SLOW_QUERY_MS):
+    if slow_query_ms <= 0:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+        if context is not None and context.execution_options.get("profiling_explain"):
+            return  # EXPLAIN 자체는 기록하지 않음
+
+        record = _current.get()
+        if record is not None:
+            record["queries"].append({"statement": statement, "duration_ms": round(elapsed_ms, 3)})
+
+        if elapsed_ms < slow_query_ms:
+            return
+        entry = {"statement": statement, "duration_ms": round(elapsed_ms, 3), "at": time.time()}
+        if statement.lstrip()[:6].upper() == "SELECT" and not executemany:
+            entry["parameters"] = parameters  # EXPLAIN 은 SELECT 만
+        try:
+            _explain_queue.put_nowait(entry)
+        except queue.Full:
+            logger.warning("느린 쿼리 %.1fms: %s", elapsed_ms, statement)
+
+    threading.Thread(target=_explain_worker, args=(engine,), daemon=True).start()
@@ -0,0 +1,171 @@
+"""
+탐색(Explore) 인기 게시글 랭킹 - Redis Sorted Set
+
+점수 = Σ 가중치 × 2^((이벤트시각 - 기준시각) / 반감기)
+  -> 최근 이벤트일수록 점수가 크고, 시간이 지나면 상대적으로 반씩 줄어드는 효과.
+  -> 좋아요/댓글/북마크 이벤트(events.py)가 올 때마다 ZINCRBY 한 번 (좋아요 테이블을 훑지 않음)
+  -> 점수가 너무 커지지 않도록 백그라운드에서 주기적으로 기준시각을 옮기고(rebase) 정리.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import events
+import models
+from database import SessionLocal
+from redis_client import rd
+
+HOT_KEY = "explore:hot"
+EPOCH_KEY = "explore:epoch"
+BUILT_KEY = "explore:built"         # rebuild() 만 씀 (EPOCH_KEY 는 이벤트가 와도 생기므로 재계산 판단에 못 씀)
+
+HALF_LIFE_SECONDS = 12 * 60 * 60    # 반감기 12시간
+WEIGHTS = {"like": 1.0, "comment": 3.0, "bookmark": 4.0}
+
+REBASE_INTERVAL_SECONDS = 10 * 60   # 10분마다 정리
+MAX_POSTS = 10000                   # 상위 N개만 유지
+MIN_SCORE = 0.01                    # 이보다 식은 글은 제거
+REBUILD_DAYS = 3                    # 키가 없을 때 DB에서 다시 계산할 기간
+
+# 기준시각 읽기 + 점수 증가를 한 번에 (rebase와 섞이지 않도록 Lua로 원자 처리)
+# KEYS[3](있으면) = 중복 전달 표시: 점수 증가와 같이 기록 -> 실패한 이벤트는 다시 전달될 때 처리됨
+_INCR_SCRIPT = """
+if KEYS[3] and not redis.call('SET', KEYS[3], 1, 'NX', 'EX', ARGV[6]) then
+    return false
+end
+local epoch = redis.call('GET', KEYS[2])
+if not epoch then
+    epoch = ARGV[3]
+    redis.call('SET', KEYS[2], epoch)
+end
+local score = tonumber(ARGV[1]) * 2 ^ ((tonumber(ARGV[2]) - tonumber(epoch)) / tonumber(ARGV[4]))
+return tostring(redis.call('ZINCRBY', KEYS[1], score, ARGV[5]))
+"""
+
+# 기준시각을 지금으로 옮기고 전체 점수를 같은 비율로 줄임 + 식은 글/초과분 제거
+_REBASE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local epoch = tonumber(redis.call('GET', KEYS[2]) or now)
+local factor = 2 ^ ((epoch - now) / tonumber(ARGV[2]))
+local items = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+for i = 1, #items, 2 do
+    redis.call('ZADD', KEYS[1], tonumber(items[i + 1]) * factor, items[i])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[3])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[4]) + 1))
+redis.call('SET', KEYS[2], now)
+return #items / 2
+"""
+
+_incr = rd.register_script(_INCR_SCRIPT) if rd is not None else None
+_rebase = rd.register_script(_REBASE_SCRIPT) if rd is not None else None
+
+
+def _timestamp(at: datetime | None):
+    return at.timestamp() if at else time.time()
+
+
+# ==========================================
+# [쓰기] 좋아요/댓글/북마크 생길 때(+), 취소될 때(-)
+# 취소는 원래 이벤트 시각(created_at)으로 빼야 정확히 상쇄됨
+# ==========================================
+def record(kind: str, post_id: int, at: datetime | None = None, sign: int = 1, seen_key: str | None = None):
+    _incr(
+        keys=[HOT_KEY, EPOCH_KEY] + ([seen_key] if seen_key else []),
+        args=[sign * WEIGHTS[kind], _timestamp(at), time.time(), HALF_LIFE_SECONDS, post_id,
+              events.SEEN_TTL_SECONDS],
+    )
+
+
+def remove_post(post_id: int):
+    rd.zrem(HOT_KEY, post_id)
+
+
+# 이벤트 컨슈머 (그룹: ranking)
+def handle_event(event: dict):
+    kind, _, action = event["type"].partition(".")
+    payload = event["payload"]
+
+    if event["type"] == "post.deleted":
+        remove_post(payload["post_id"])
+    elif kind in WEIGHTS:
+        seen = events.seen_key("ranking", event)
+        if action == "created":
+            record(kind, payload["post_id"], event["at"], seen_key=seen)
+        elif action == "deleted":
+            record(kind, payload["post_id"], datetime.fromisoformat(payload["created_at"]), sign=-1, seen_key=seen)
+
+
+# ==========================================
+# [읽기] 상위 게시글 id (ZREVRANGE: O(log n + k))
+# ==========================================
+def top_post_ids(offset: int = 0, limit: int = 20):
+    """Redis 를 못 쓰면 None (호출한 쪽에서 DB 로 대신 보여줌)"""
+    if rd is None:
+        return None
+    try:
+        return [int(pid) for pid in rd.zrevrange(HOT_KEY, offset, offset + limit - 1)]
+    except Exception as e:
+        print(f"탐색 순위 조회 실패: {e}")
+        return None
+
+
+# ==========================================
+# [백그라운드] 정리 + 키가 없을 때 DB로부터 재계산
+# ==========================================
+def rebase():
+    return _rebase(
+        keys=[HOT_KEY, EPOCH_KEY],
+        args=[time.time(), HALF_LIFE_SECONDS, MIN_SCORE, MAX_POSTS],
+    )
+
+
+def rebuild(db: Session, days: int = REBUILD_DAYS):
+    now = time.time()
+    since = datetime.fromtimestamp(now) - timedelta(days=days)
+    scores = {}
+    for kind, model in (("like", models.Like), ("comment", models.Comment), ("bookmark", models.Bookmark)):
+        stmt = (
+            select(model.post_id, model.created_at)
+            .where(model.created_at >= since)
+            .execution_options(yield_per=5000)
+        )
+        for post_id, created_at in db.execute(stmt):
+            boost = 2 ** ((_timestamp(created_at) - now) / HALF_LIFE_SECONDS)
+            scores[post_id] = scores.get(post_id, 0.0) + WEIGHTS[kind] * boost
+
+    # 임시 키에 다 쓴 뒤 RENAME으로 한 번에 교체
+    tmp_key = f"{HOT_KEY}:rebuild"
+    pipe = rd.pipeline()
+    pipe.delete(tmp_key)
+    if scores:
+        pipe.zadd(tmp_key, scores)
+        pipe.rename(tmp_key, HOT_KEY)
+    else:
+        pipe.delete(HOT_KEY)
+    pipe.set(EPOCH_KEY, now)
+    pipe.set(BUILT_KEY, now)
+    pipe.execute()
+    return len(scores)
+
+
+def _rebuild_if_missing():
+    if not rd.exists(BUILT_KEY):
+        with SessionLocal() as db:
+            rebuild(db)
+
+
+async def run_forever():
+    if rd is None:
+        return
+    while True:
+        try:
+            await run_in_threadpool(_rebuild_if_missing)
+            await run_in_threadpool(rebase)
+        except Exception as e:
+            print(f"랭킹 정리 실패: {e}")
+        await asyncio.sleep(REBASE_INTERVAL_SECONDS)
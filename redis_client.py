@@ -0,0 +1,21 @@
+import redis
+import redis.asyncio
+
+# ==========================================
+# Redis 연결 (main.py와 라우터들이 같이 씀)
+# (Docker로 띄운 Redis에 접속 시도)
+# ==========================================
+REDIS_HOST = 'localhost'
+REDIS_PORT = 6379
+
+try:
+    # decode_responses=True를 하면 데이터가 byte가 아니라 string으로 나옴
+    rd = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+except Exception as e:
+    print(f"Redis 연결 에러: {e}")
+    rd = None
+
+
+# 백그라운드에서 pub/sub 구독처럼 오래 기다리는 작업용 (이벤트 루프를 막지 않음)
+def async_client():
+    return redis.asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
@@ -0,0 +1,435 @@
+"""
+접속 로그 재생 부하 테스트 (uvicorn access log -> 실제와 비슷한 요청 섞임으로 다시 보내기)
+
+사용법:
+    python replay.py seed --users 200 --posts 1000                  # 로컬 DB에 재생용 유저/글 만들기
+    python replay.py run nohup.out -o before.json --speedup 10      # 앱을 직접(ASGI) 호출
+    python replay.py run nohup.out -o after.json --url http://127.0.0.1:8000 --repeat 20
+    python replay.py compare before.json after.json                 # 두 빌드의 라우트별 지연/에러율 차이
+
+- 로그 한 줄 = 요청 하나 (메서드, 경로, 상태코드, 접속 주소). 라우트 템플릿(/posts/{post_id})으로 묶어서 집계
+- 간격: 줄 앞에 시각이 찍혀 있으면(로그 포맷에 asctime 추가 시) 실제 간격 / speedup,
+  uvicorn 기본 포맷처럼 시각이 없으면 로그 순서는 그대로 두고 --rate 에 맞춘 지수분포(포아송 도착) 간격
+- 인증: 접속(주소:포트)마다 재생용 유저 한 명을 배정해 토큰을 붙임 (/admin 은 관리자 유저). POST /login 은 실제 로그인
+- 경로의 id 는 시드 데이터 id 로 바꾸고, 본문이 필요한 쓰기 API 는 BODY_BUILDERS 로 만들어 보냄
+- 에러율 = 5xx + 연결 실패 비율 (4xx 는 따로 집계: 중복 좋아요 409 등은 정상 동작)
+
+httpx 가 필요함 (pip install httpx). 앱/DB 설정은 서버와 같은 것(database.py, redis_client.py)을 씀
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from urllib.parse import unquote
+
+import httpx
+from starlette.routing import Match, Mount, Route
+
+import crud
+import dependencies
+import models
+from database import SessionLocal
+
+SEED_EMAIL = "replay{}@example.com"
+SEED_PASSWORD = "replay-password"
+ADMIN_EMAIL = "replay-admin@example.com"
+
+DEFAULT_RATE = 20.0                 # 시각 없는 로그: 초당 요청 수 (speedup 적용 전)
+
+ACCESS_LINE = re.compile(
+    r'^(?:(?P<ts>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)\s+)?.*?'
+    r'(?P<client>[^\s"]+):(?P<port>\d+) - "(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})'
+)
+
+# 1x1 PNG (업로드용, 매번 끝에 다른 바이트를 붙여 중복 제거를 피함)
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+# ==========================================
+# [1] 로그 읽기
+# ==========================================
+def parse_log(lines):
+    """접근 로그 줄 -> 요청 목록 [{"at", "method", "path", "status", "conn"}] (at 은 초, 없으면 None)"""
+    entries = []
+    for line in lines:
+        match = ACCESS_LINE.search(line)
+        if not match:
+            continue
+        at = None
+        if match["ts"]:
+            at = datetime.fromisoformat(match["ts"].replace(",", ".")).timestamp()
+        entries.append({
+            "at": at,
+            "method": match["method"],
+            "path": match["path"],
+            "status": int(match["status"]),
+            "conn": f"{match['client']}:{match['port']}",
+        })
+    return entries
+
+
+def schedule(entries, speedup: float = 1.0, rate: float = DEFAULT_RATE, seed: int = 0):
+    """요청마다 시작 시각(초, 0부터)을 붙임"""
+    rng = random.Random(seed)
+    timed = all(entry["at"] is not None for entry in entries)
+    start = entries[0]["at"] if timed and entries else 0
+    offset = 0.0
+    for entry in entries:
+        if timed:
+            offset = (entry["at"] - start) / speedup
+        else:
+            offset += rng.expovariate(rate * speedup)
+        entry["offset"] = offset
+    return entries
+
+
+def repeat(entries, times: int):
+    """짧은 로그를 여러 번 이어 붙임 (시각이 있으면 뒤로 밀어서)"""
+    result = []
+    span = 0.0
+    if entries and entries[0]["at"] is not None:
+        span = entries[-1]["at"] - entries[0]["at"] + 1
+    for n in range(times):
+        for entry in entries:
+            copy = dict(entry)
+            if copy["at"] is not None:
+                copy["at"] += n * span
+            result.append(copy)
+    return result
+
+
+def route_of(app, method: str, path: str):
+    """실제 경로 -> (라우트 템플릿, 라우트 객체)"""
+    scope = {"type": "http", "path": unquote(path.split("?")[0]), "method": method}
+    partial = None
+    for route in app.routes:
+        match, child = route.matches(scope)
+        if match == Match.FULL:
+            if isinstance(route, Mount):
+                return route.path + "/*", route
+            return route.path, route
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    if partial is not None:
+        return partial.path, partial
+    return "(unmatched)", None
+
+
+def mix(app, entries):
+    """라우트별 요청 비율과 원래 상태코드 분포"""
+    summary = {}
+    for entry in entries:
+        template, _ = route_of(app, entry["method"], entry["path"])
+        key = f"{entry['method']} {template}"
+        item = summary.setdefault(key, {"count": 0, "statuses": {}})
+        item["count"] += 1
+        item["statuses"][entry["status"]] = item["statuses"].get(entry["status"], 0) + 1
+    total = len(entries) or 1
+    for item in summary.values():
+        item["share"] = round(item["count"] / total, 4)
+    return dict(sorted(summary.items(), key=lambda kv: -kv[1]["count"]))
+
+
+# ==========================================
+# [2] 시드 데이터 (재생용 유저/글)
+# ==========================================
+def seed(db, users: int = 100, posts: int = 500, comments: int = 2000, likes: int = 5000, follows: int = 2000):
+    rng = random.Random(0)
+    password = crud.get_password_hash(SEED_PASSWORD)  # bcrypt 는 느려서 한 번만
+    existing = {email for (email,) in db.query(models.User.email).filter(models.User.email.like("replay%"))}
+
+    new_users = [
+        models.User(email=SEED_EMAIL.format(i), password=password, nickname=f"replay{i}")
+        for i in range(users) if SEED_EMAIL.format(i) not in existing
+    ]
+    if ADMIN_EMAIL not in existing:
+        new_users.append(models.User(email=ADMIN_EMAIL, password=password, nickname="replay-admin", is_admin=True))
+    db.add_all(new_users)
+    db.flush()
+
+    user_ids = [uid for (uid,) in db.query(models.User.id).filter(models.User.email.like("replay%"))]
+    db.add_all(
+        models.Post(content=f"replay post {i} #replay", image_url=f"/static/replay/{i}.png", user_id=rng.choice(user_ids))
+        for i in range(posts)
+    )
+    db.flush()
+    post_ids = [pid for (pid,) in db.query(models.Post.id).filter(models.Post.user_id.in_(user_ids))]
+
+    db.add_all(
+        models.Comment(content=f"replay comment {i}", user_id=rng.choice(user_ids), post_id=rng.choice(post_ids))
+        for i in range(comments)
+    )
+    pairs = {(rng.choice(user_ids), rng.choice(post_ids)) for _ in range(likes)}
+    existing_likes = set(db.query(models.Like.user_id, models.Like.post_id).filter(models.Like.user_id.in_(user_ids)).all())
+    db.add_all(models.Like(user_id=u, post_id=p) for u, p in pairs - existing_likes)
+
+    edges = {(rng.choice(user_ids), rng.choice(user_ids)) for _ in range(follows)}
+    existing_edges = set(db.query(models.follow_table.c.follower_id, models.follow_table.c.following_id).filter(
+        models.follow_table.c.follower_id.in_(user_ids)).all())
+    rows = [{"follower_id": a, "following_id": b} for a, b in edges - existing_edges if a != b]
+    if rows:
+        db.execute(models.follow_table.insert(), rows)
+    db.commit()
+    return {"users": len(user_ids), "posts": len(post_ids)}
+
+
+def load_fixtures(db):
+    """재생에 쓸 시드 id 들 + 토큰"""
+    users = db.query(models.User.id, models.User.email).filter(
+        models.User.email.like("replay%"), models.User.is_admin.is_(False)
+    ).all()
+    admin = db.query(models.User.email).filter(models.User.email == ADMIN_EMAIL).scalar()
+    if not users:
+        sys.exit("재생용 유저가 없습니다. 먼저 `python replay.py seed` 를 실행하세요.")
+    user_ids = [uid for uid, _ in users]
+    post_ids = [pid for (pid,) in db.query(models.Post.id).filter(models.Post.user_id.in_(user_ids))]
+    comment_ids = [cid for (cid,) in db.query(models.Comment.id).filter(models.Comment.user_id.in_(user_ids))]
+    return {
+        "users": [{"id": uid, "email": email, "token": dependencies.create_access_token({"sub": email})}
+                  for uid, email in users],
+        "admin_token": dependencies.create_access_token({"sub": admin}) if admin else None,
+        "user_ids": user_ids,
+        "post_ids": post_ids or [0],
+        "comment_ids": comment_ids or [0],
+    }
+
+
+# ==========================================
+# [3] 요청 만들기 (경로 id 바꾸기 + 본문)
+# ==========================================
+def _fill_path(route, path: str, fixtures, rng):
+    if not isinstance(route, Route) or not route.param_convertors:
+        return path
+    params = route.param_convertors
+    match = route.path_regex.match(unquote(path.split("?")[0]))
+    if not match:
+        return path
+    new_path = route.path
+    for name in params:
+        value = match[name]
+        if name == "post_id":
+            value = rng.choice(fixtures["post_ids"])
+        elif name in ("user_id", "target_id"):
+            value = rng.choice(fixtures["user_ids"])
+        elif name == "comment_id":
+            value = rng.choice(fixtures["comment_ids"])
+        new_path = re.sub(r"\{" + name + r"(:[^}]*)?\}", str(value), new_path)
+    query = path.partition("?")[2]
+    return new_path + ("?" + query if query else "")
+
+
+def _login(session, fixtures, rng, counter):
+    return {"data": {"username": session["email"], "password": SEED_PASSWORD}}
+
+
+def _signup(session, fixtures, rng, counter):
+    return {"json": {"email": f"replay-new{os.getpid()}-{counter}@example.com", "password": SEED_PASSWORD,
+                     "nickname": f"replay-new{counter}"}}
+
+
+def _post(session, fixtures, rng, counter):
+    image = _PNG + counter.to_bytes(8, "big")
+    return {"data": {"content": f"replay upload {counter} #replay"}, "files": {"file": ("replay.png", image, "image/png")}}
+
+
+def _comment(session, fixtures, rng, counter):
+    return {"json": {"post_id": rng.choice(fixtures["post_ids"]), "content": f"replay {counter}"}}
+
+
+def _post_id(session, fixtures, rng, counter):
+    return {"json": {"post_id": rng.choice(fixtures["post_ids"])}}
+
+
+def _profile(session, fixtures, rng, counter):
+    return {"data": {"nickname": f"replay{session['id']}"}}
+
+
+BODY_BUILDERS = {
+    ("POST", "/login"): _login,
+    ("POST", "/signup"): _signup,
+    ("POST", "/posts"): _post,
+    ("POST", "/comments"): _comment,
+    ("POST", "/likes"): _post_id,
+    ("POST", "/bookmarks"): _post_id,
+    ("PATCH", "/me"): _profile,
+}
+
+
+# ==========================================
+# [4] 재생 + 측정
+# ==========================================
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(results, elapsed: float):
+    routes = {}
+    for key, status, latency in results:
+        item = routes.setdefault(key, {"latencies": [], "errors": 0, "client_errors": 0})
+        item["latencies"].append(latency)
+        if status is None or status >= 500:
+            item["errors"] += 1
+        elif status >= 400:
+            item["client_errors"] += 1
+
+    report = {}
+    for key, item in sorted(routes.items(), key=lambda kv: -len(kv[1]["latencies"])):
+        latencies = item["latencies"]
+        report[key] = {
+            "count": len(latencies),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "error_rate": round(item["errors"] / len(latencies), 4),
+            "client_error_rate": round(item["client_errors"] / len(latencies), 4),
+        }
+    return {"requests": len(results), "elapsed_s": round(elapsed, 2), "routes": report}
+
+
+async def replay(app, entries, fixtures, url: str | None = None, concurrency: int = 50, seed_value: int = 0):
+    rng = random.Random(seed_value)
+    sessions = {}
+    results = []
+    gate = asyncio.Semaphore(concurrency)
+
+    if url:
+        transport = None
+        base_url = url
+    else:
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://replay"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=30) as client:
+
+        async def send(i, entry):
+            template, route = route_of(app, entry["method"], entry["path"])
+            key = f"{entry['method']} {template}"
+            session = sessions.setdefault(entry["conn"], rng.choice(fixtures["users"]))
+            token = fixtures["admin_token"] if template.startswith("/admin") else session["token"]
+            kwargs = {"headers": {"Authorization": f"Bearer {token}"}}
+            builder = BODY_BUILDERS.get((entry["method"], template))
+            if builder:
+                kwargs.update(builder(session, fixtures, rng, i))
+            path = _fill_path(route, entry["path"], fixtures, rng) if route else entry["path"]
+
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(entry["method"], path, **kwargs)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    print(f"요청 실패 ({key}): {e}")
+                    status = None
+                results.append((key, status, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        tasks = []
+        for i, entry in enumerate(entries):
+            # 열린 부하(open-loop): 앞 요청이 끝나길 기다리지 않고 예정 시각에 보냄
+            delay = entry["offset"] - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(i, entry)))
+        await asyncio.gather(*tasks)
+        return summarize(results, time.perf_counter() - started)
+
+
+# ==========================================
+# [5] 두 빌드 비교
+# ==========================================
+def _delta(before, after):
+    if before is None or after is None:
+        return None
+    if before == 0:
+        return None if after == 0 else float("inf")
+    return (after - before) / before
+
+
+def compare(before: dict, after: dict):
+    lines = [f"{'route':<40} {'count':>7} {'p50 ms':>16} {'p95 ms':>16} {'err %':>14}"]
+    for key in sorted(set(before["routes"]) | set(after["routes"])):
+        b, a = before["routes"].get(key), after["routes"].get(key)
+        if not b or not a:
+            lines.append(f"{key:<40} {'(한쪽에만 있음)':>7}")
+            continue
+
+        def cell(field):
+            change = _delta(b[field], a[field])
+            text = "" if change is None else f"({change:+.0%})"
+            return f"{a[field]:>8} {text:>7}"
+
+        errors = f"{b['error_rate'] * 100:.1f}->{a['error_rate'] * 100:.1f}"
+        lines.append(f"{key:<40} {a['count']:>7} {cell('p50_ms')} {cell('p95_ms')} {errors:>14}")
+    return "\n".join(lines)
+
+
+def _load_app():
+    import main  # 앱 전체 (라우트 매칭 + ASGI 재생)
+    return main.app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="접속 로그 재생 부하 테스트")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="재생용 유저/게시글 만들기")
+    p_seed.add_argument("--users", type=int, default=100)
+    p_seed.add_argument("--posts", type=int, default=500)
+
+    p_mix = sub.add_parser("mix", help="로그의 라우트별 요청 비율만 보기")
+    p_mix.add_argument("log")
+
+    p_run = sub.add_parser("run", help="로그 재생")
+    p_run.add_argument("log")
+    p_run.add_argument("-o", "--output", help="결과 JSON 저장 경로 (compare 용)")
+    p_run.add_argument("--url", help="실행 중인 서버 주소 (없으면 앱을 직접 호출)")
+    p_run.add_argument("--speedup", type=float, default=1.0, help="몇 배 빠르게 보낼지")
+    p_run.add_argument("--rate", type=float, default=DEFAULT_RATE, help="시각 없는 로그의 초당 요청 수")
+    p_run.add_argument("--repeat", type=int, default=1, help="로그를 몇 번 이어 붙일지")
+    p_run.add_argument("--concurrency", type=int, default=50)
+    p_run.add_argument("--seed", type=int, default=0, help="무작위 선택 고정값")
+
+    p_cmp = sub.add_parser("compare", help="두 결과 비교 (before -> after)")
+    p_cmp.add_argument("before")
+    p_cmp.add_argument("after")
+
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        with SessionLocal() as db:
+            print(seed(db, users=args.users, posts=args.posts))
+    elif args.command == "mix":
+        with open(args.log, encoding="utf-8", errors="replace") as f:
+            print(json.dumps(mix(_load_app(), parse_log(f)), ensure_ascii=False, indent=2))
+    elif args.command == "run":
+        with open(args.log, encoding="utf-8", errors="replace") as f:
+            entries = parse_log(f)
+        if not entries:
+            sys.exit("로그에서 요청 줄을 찾지 못했습니다.")
+        entries = schedule(repeat(entries, args.repeat), speedup=args.speedup, rate=args.rate, seed=args.seed)
+        app = _load_app()
+        with SessionLocal() as db:
+            fixtures = load_fixtures(db)
+        report = asyncio.run(replay(app, entries, fixtures, url=args.url,
+                                    concurrency=args.concurrency, seed_value=args.seed))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    elif args.command == "compare":
+        with open(args.before, encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, encoding="utf-8") as f:
+            after = json.load(f)
+        print(compare(before, after))
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, SessionLocal
 import models, schemas, dependencies
+import analytics, archive, backup, events, uploads, entity_cache, profiling
 
 router = APIRouter(
     prefix="/admin",
@@ -40,7 +43,10 @@ def ban_user(
         raise HTTPException(status_code=404, detail="유저가 없습니다.")
         
     db.delete(user)
+    uploads.release(db, user.image_url)
+    events.add(db, "user.deleted", user_id=user_id, nickname=user.nickname)
     db.commit()
+    entity_cache.invalidate("user", user_id)
     return
 
 # ==========================================
@@ -58,6 +64,170 @@ def delete_post_admin(
     if not post:
         raise HTTPException(status_code=404, detail="게시글이 없습니다.")
         
+    tags = [tag.name for tag in post.hashtags]
+    images = post.images
     db.delete(post)
+    archive.remove_post(db, post_id)
+    for url in images:  # 여러 장 게시글은 사진마다 참조 (대표 사진은 첫 장과 같은 참조)
+        uploads.release(db, url)
+    events.add(db, "post.deleted", post_id=post_id, user_id=post.user_id, hashtags=tags)
     db.commit()
-    return
\ No newline at end of file
+    entity_cache.invalidate("post", post_id)
+    return
+
+# ==========================================
+# [API 36] 전체 데이터 내보내기 (NDJSON 스트리밍 백업)
+# ==========================================
+@router.get("/export")
+def export_data(
+    tables: list[str] = Query(None),
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    check_admin(current_user)
+
+    if tables:
+        unknown = set(tables) - set(backup.EXPORT_TABLES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"알 수 없는 테이블: {', '.join(sorted(unknown))}")
+
+    # 응답이 끝날 때까지 쓸 세션은 따로 열어서 스트리밍 (서버 사이드 커서)
+    def stream():
+        with SessionLocal() as export_db:
+            yield from backup.iter_ndjson(export_db, tables)
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="instagram.ndjson"'},
+    )
+
+# ==========================================
+# [API 40] 이벤트 버스 상태 (아웃박스 대기 수, 그룹별 지연)
+# ==========================================
+@router.get("/events/stats")
+def read_event_stats(
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    check_admin(current_user)
+    return events.stats(db)
+
+# ==========================================
+# [API 41] 이벤트 재처리
+# - group 지정: 해당 컨슈머 그룹 커서를 from_id(스트림 id)로 되돌림
+#   (reset_seen=true 면 이미 처리한 이벤트도 다시 적용: Redis 데이터를 잃었을 때)
+# - since_event_id 지정: 아웃박스에서 다시 발행 (모든 그룹)
+# ==========================================
+@router.post("/events/replay")
+def replay_events(
+    group: str = None,
+    from_id: str = "0",
+    reset_seen: bool = False,
+    since_event_id: int = None,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    check_admin(current_user)
+
+    if group:
+        if group not in events.GROUPS:
+            raise HTTPException(status_code=404, detail=f"없는 컨슈머 그룹입니다. ({', '.join(sorted(events.GROUPS))})")
+        events.replay_group(group, from_id, reset_seen, db)
+        return {"message": f"{group} 그룹을 {from_id}부터 다시 처리합니다."}
+    if since_event_id is not None:
+        count = events.replay_outbox(db, since_event_id)
+        return {"message": f"이벤트 {count}건을 다시 발행합니다."}
+    raise HTTPException(status_code=400, detail="group 또는 since_event_id가 필요합니다.")
+
+# ==========================================
+# [API 43] 프로파일링 대상 등록 (경로/유저 기준으로 요청 N개)
+# ==========================================
+@router.post("/profiling", status_code=status.HTTP_201_CREATED)
+def create_profiling_target(
+    target: schemas.ProfilingTargetCreate,
+    current_user: models.User = Depends(dependencies.get_current_user),
+):
+    check_admin(current_user)
+    if not target.path_prefix and not target.user_email:
+        raise HTTPException(status_code=400, detail="path_prefix 또는 user_email이 필요합니다.")
+    return profiling.add_target(**target.model_dump())
+
+# ==========================================
+# [API 44] 프로파일링 대상 목록 / 해제
+# ==========================================
+@router.get("/profiling")
+def read_profiling_targets(current_user: models.User = Depends(dependencies.get_current_user)):
+    check_admin(current_user)
+    return profiling.list_targets()
+
+@router.delete("/profiling/{target_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_profiling_target(
+    target_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+):
+    check_admin(current_user)
+    if not profiling.remove_target(target_id):
+        raise HTTPException(status_code=404, detail="프로파일링 대상이 없습니다.")
+    return
+
+# ==========================================
+# [API 45] 프로파일링 결과 (format=folded 이면 플레임그래프용 접힌 스택 텍스트)
+# ==========================================
+@router.get("/profiling/results")
+def read_profiling_results(
+    limit: int = Query(20, ge=1, le=profiling.MAX_RESULTS),
+    current_user: models.User = Depends(dependencies.get_current_user),
+):
+    check_admin(current_user)
+    return profiling.list_results(limit)
+
+@router.get("/profiling/results/{result_id}")
+def read_profiling_result(
+    result_id: str,
+    format: str = Query("json", pattern="^(json|folded)$"),
+    current_user: models.User = Depends(dependencies.get_current_user),
+):
+    check_admin(current_user)
+    result = profiling.get_result(result_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="결과가 없습니다.")
+    if format == "folded":
+        if "folded" not in result:
+            raise HTTPException(status_code=400, detail="sample 모드 결과만 folded로 볼 수 있습니다.")
+        return PlainTextResponse(result["folded"])
+    return result
+
+# ==========================================
+# [API 46] 느린 쿼리 목록 (실행 계획 포함)
+# ==========================================
+@router.get("/profiling/slow-queries")
+def read_slow_queries(
+    limit: int = Query(50, ge=1, le=profiling.MAX_SLOW_QUERIES),
+    current_user: models.User = Depends(dependencies.get_current_user),
+):
+    check_admin(current_user)
+    return profiling.list_slow_queries(limit)
+
+# ==========================================
+# [API 54] 통계 대시보드 (가입/글/댓글/좋아요/북마크 수, 활동 유저, 가입경로 비율)
+# 미리 집계해 둔 시간/일 단위 표만 읽음 (원본 테이블을 훑지 않음)
+# ==========================================
+@router.get("/analytics")
+def read_analytics(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start: datetime = None,                      # 없으면 day: 최근 30일, hour: 최근 48시간
+    end: datetime = None,
+    metrics: list[str] = Query(None),
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    check_admin(current_user)
+    if metrics and set(metrics) - set(analytics.METRICS):
+        raise HTTPException(status_code=400, detail=f"지원하는 지표: {', '.join(analytics.METRICS)}")
+
+    end = end or datetime.now()
+    start = start or end - (timedelta(days=30) if granularity == "day" else timedelta(hours=48))
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start는 end보다 앞이어야 합니다.")
+    return analytics.dashboard(db, granularity, start, end, metrics)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from database import get_db
-import models, schemas, dependencies
+import models, schemas, dependencies, events
 import requests
 import firebase_admin
 from firebase_admin import auth as firebase_auth
@@ -84,6 +84,8 @@ def kakao_callback(code: str, db: Session = Depends(get_db)):
             password=None
         )
         db.add(user)
+        db.flush()
+        events.add(db, "user.created", user_id=user.id, nickname=user.nickname)
         db.commit()
         db.refresh(user)
 
@@ -134,6 +136,8 @@ def firebase_login(request: FirebaseLoginRequest, db: Session = Depends(get_db))
             password=None
         )
         db.add(user)
+        db.flush()
+        events.add(db, "user.created", user_id=user.id, nickname=user.nickname)
         db.commit()
         db.refresh(user)
 
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+
+from database import get_db
+import models, schemas, dependencies
+
+router = APIRouter(
+    tags=["Batch (묶음 요청)"],
+)
+
+ITEM_TIMEOUT_SECONDS = 10
+# 묶음 안에서 부를 수 없는 경로 (자기 자신, 끝나지 않는 스트리밍 응답)
+BLOCKED_PREFIXES = ("/batch", "/notifications/stream", "/admin/export")
+# 하위 요청에 넘기지 않는 헤더 (본문은 없음)
+DROPPED_HEADERS = {b"content-length", b"content-type", b"transfer-encoding"}
+
+
+def _uses_db(dependant):
+    return any(dep.call is get_db or _uses_db(dep) for dep in dependant.dependencies)
+
+
+def _needs_session(app, scope):
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return isinstance(route, APIRoute) and _uses_db(route.dependant)
+    return False
+
+
+async def _call(app, scope):
+    """앱을 직접 호출해 (상태코드, 본문) 을 받음 (미들웨어/예외 처리는 일반 요청과 같음)"""
+    status = 500
+    body = []
+    content_type = ""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers = dict(message.get("headers", []))
+            content_type = headers.get(b"content-type", b"").decode()
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    try:
+        await asyncio.wait_for(app(scope, receive, send), ITEM_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return 504, {"detail": "하위 요청 시간이 초과되었습니다."}
+    except Exception as e:
+        print(f"묶음 하위 요청 에러 ({scope['path']}): {e}")
+        return 500, {"detail": "서버 내부 오류입니다."}
+
+    raw = b"".join(body)
+    if content_type.startswith("application/json") and raw:
+        return status, json.loads(raw)
+    return status, raw.decode(errors="replace") or None
+
+
+# ==========================================
+# [API 53] 묶음 요청 (여러 GET을 한 번에: 프로필 화면 등)
+# 로그인 확인 1번 + DB 세션 1개를 하위 요청들이 같이 씀
+# DB를 쓰는 요청은 세션을 나눠 쓸 수 없어서 차례대로, DB를 안 쓰는 요청(Redis 등)은 동시에 실행
+# 차례대로 도는 요청 사이에는 롤백 (앞 요청이 실패해도 다음 요청은 깨끗한 세션)
+# 시간 초과된 요청은 스레드에서 계속 돌며 세션을 쓰고 있을 수 있음 -> 남은 요청은 각자 세션/로그인 확인
+# ==========================================
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def batch(
+    body: schemas.BatchRequest,
+    request: Request,
+    current_user: models.User = Depends(dependencies.get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    app = request.app
+    headers = [(k, v) for k, v in request.scope["headers"] if k not in DROPPED_HEADERS]
+    base_scope = {
+        key: request.scope[key]
+        for key in ("type", "asgi", "http_version", "scheme", "server", "client", "root_path")
+        if key in request.scope
+    }
+
+    responses = [None] * len(body.requests)
+    serial = []
+    parallel = []
+    for i, item in enumerate(body.requests):
+        path, _, query = item.path.partition("?")
+        if not path.startswith("/") or path.startswith(BLOCKED_PREFIXES):
+            responses[i] = {"id": item.id, "status": 400, "body": {"detail": "묶음 요청에 쓸 수 없는 경로입니다."}}
+            continue
+        scope = {
+            **base_scope,
+            "method": "GET",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "headers": headers,
+            "batch_db": db,
+            "batch_user": current_user,
+        }
+        (serial if _needs_session(app, scope) else parallel).append((i, item, scope))
+
+    async def run(i, item, scope):
+        status, result = await _call(app, scope)
+        responses[i] = {"id": item.id, "status": status, "body": result}
+
+    async def run_serial():
+        shared = True
+        for i, item, scope in serial:
+            if not shared:
+                scope = {k: v for k, v in scope.items() if k not in ("batch_db", "batch_user")}
+            await run(i, item, scope)
+            if responses[i]["status"] == 504:
+                shared = False
+            elif shared:
+                await run_in_threadpool(db.rollback)
+
+    await asyncio.gather(run_serial(), *(run(*job) for job in parallel))
+    return {"responses": responses}
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
-import models, schemas, dependencies
+import models, schemas, dependencies, events, archive
 
 router = APIRouter(
     prefix="/bookmarks",
@@ -20,11 +21,13 @@ def create_bookmark(
         models.Bookmark.post_id == bookmark.post_id
     ).first()
     
-    if existing:
+    # 오래된 북마크는 보관 저장소로 옮겨졌을 수 있음
+    if existing or archive.find(db, "bookmark", current_user.id, bookmark.post_id):
         raise HTTPException(status_code=409, detail="이미 보관함에 있습니다.")
 
     new_bookmark = models.Bookmark(user_id=current_user.id, post_id=bookmark.post_id)
     db.add(new_bookmark)
+    events.add(db, "bookmark.created", post_id=bookmark.post_id, user_id=current_user.id)
     db.commit()
     db.refresh(new_bookmark)
     return new_bookmark
@@ -41,10 +44,17 @@ def delete_bookmark(
         models.Bookmark.post_id == post_id
     ).first()
     
-    if not bookmark:
-        raise HTTPException(status_code=404, detail="보관함에 없는 글입니다.")
+    if bookmark:
+        db.delete(bookmark)
+        created_at = bookmark.created_at
+    else:
+        # 원래 테이블에 없으면 보관된 북마크에서 삭제
+        archived = archive.remove(db, "bookmark", current_user.id, post_id)
+        if not archived:
+            raise HTTPException(status_code=404, detail="보관함에 없는 글입니다.")
+        created_at = archived["created_at"]
 
-    db.delete(bookmark)
+    events.add(db, "bookmark.deleted", post_id=post_id, user_id=current_user.id, created_at=created_at)
     db.commit()
     return
 
@@ -54,4 +64,13 @@ def read_my_bookmarks(
     current_user: models.User = Depends(dependencies.get_current_user),
     db: Session = Depends(get_db)
 ):
-    return db.query(models.Bookmark).filter(models.Bookmark.user_id == current_user.id).all()
\ No newline at end of file
+    bookmarks = db.query(models.Bookmark).filter(models.Bookmark.user_id == current_user.id).all()
+
+    # 오래된 북마크(보관분)도 이어서 보여줌 (그새 지워진 글은 제외)
+    archived = archive.rows(db, "bookmark", current_user.id)
+    if archived:
+        alive = set(db.scalars(
+            select(models.Post.id).where(models.Post.id.in_([row["post_id"] for row in archived]))
+        ))
+        bookmarks += [row for row in archived if row["post_id"] in alive]
+    return bookmarks
\ No newline at end of file
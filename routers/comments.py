@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
+from typing import Optional
 from database import get_db
-import models, schemas, dependencies
+import models, schemas, dependencies, crud, events, entity_cache, archive
 
 router = APIRouter(
     prefix="/comments",
@@ -17,8 +18,8 @@ def create_comment(
     current_user: models.User = Depends(dependencies.get_current_user), # 로그인 필수
     db: Session = Depends(get_db)
 ):
-    # 1. 게시글이 진짜 있는지 확인
-    post = db.query(models.Post).filter(models.Post.id == comment.post_id).first()
+    # 1. 게시글이 진짜 있는지 확인 (캐시)
+    post = entity_cache.get_post(db, comment.post_id)
     if not post:
         raise HTTPException(status_code=404, detail="게시글을 찾을 수 없습니다.")
 
@@ -29,6 +30,9 @@ def create_comment(
         post_id=comment.post_id
     )
     db.add(db_comment)
+    db.flush()  # 댓글 id를 이벤트에 넣기 위해
+    events.add(db, "comment.created", comment_id=db_comment.id, post_id=comment.post_id,
+               user_id=current_user.id, post_owner_id=post["user_id"])
     db.commit()
     db.refresh(db_comment)
     
@@ -38,9 +42,42 @@ def create_comment(
 # [API 7] 댓글 목록 조회 (특정 게시글의 댓글만)
 # ==========================================
 @router.get("", response_model=list[schemas.CommentResponse])
-def read_comments(post_id: int, db: Session = Depends(get_db)):
+def read_comments(
+    post_id: int,
+    before_id: Optional[int] = None,                 # 커서: 이 id보다 오래된 댓글만
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
     # 해당 post_id를 가진 댓글만 가져오기
-    return db.query(models.Comment).filter(models.Comment.post_id == post_id).all()
+    query = db.query(models.Comment).filter(models.Comment.post_id == post_id)
+
+    # 커서/개수 지정이 없으면 기존처럼 전부 (보관된 오래된 댓글이 앞쪽)
+    if before_id is None and limit is None:
+        return archive.rows(db, "comment", post_id)[::-1] + query.all()
+
+    # 커서 기반: 최신순으로 before_id 이전 댓글 limit개
+    limit = limit or 20
+    if before_id is not None:
+        query = query.filter(models.Comment.id < before_id)
+    comments = query.order_by(models.Comment.id.desc()).limit(limit).all()
+
+    # 원래 테이블에서 모자라면 보관된 댓글로 이어서 채움
+    if len(comments) < limit:
+        cursor = comments[-1].id if comments else before_id
+        comments += archive.rows(db, "comment", post_id, before_ref=cursor, limit=limit - len(comments))
+    return comments
+
+# ==========================================
+# [API 37] 여러 게시글 댓글 미리보기 (최신 N개 + 총 개수)
+# ==========================================
+@router.get("/preview", response_model=list[schemas.CommentPreviewResponse])
+def read_comment_previews(
+    post_ids: list[int] = Query(..., max_length=100),
+    limit: int = Query(3, ge=1, le=20),
+    db: Session = Depends(get_db)
+):
+    previews = crud.get_comment_previews(db, post_ids, limit=limit)
+    return list(previews.values())
 
 # ==========================================
 # [API 8] 댓글 삭제
@@ -48,19 +85,30 @@ def read_comments(post_id: int, db: Session = Depends(get_db)):
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_comment(
     comment_id: int,
+    post_id: Optional[int] = None,  # 보관된(오래된) 댓글이면 이 글의 덩어리만 잠금 (없으면 먼저 찾아봄)
     current_user: models.User = Depends(dependencies.get_current_user),
     db: Session = Depends(get_db)
 ):
     # 1. 댓글 찾기
     comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+    if comment:
+        db.delete(comment)
+        comment = {"post_id": comment.post_id, "user_id": comment.user_id, "created_at": comment.created_at}
+    else:
+        # 오래된 댓글은 보관 저장소에서 삭제 (아래에서 거절되면 commit 안 하므로 그대로 남음)
+        # post_id 를 안 보낸 예전 클라이언트: 잠그지 않고 어느 글의 댓글인지 먼저 찾음
+        if post_id is None:
+            post_id = archive.comment_post_id(db, comment_id)
+        comment = archive.remove_comment(db, post_id, comment_id) if post_id is not None else None
     if not comment:
         raise HTTPException(status_code=404, detail="댓글이 없습니다.")
     
     # 2. 내 댓글인지 확인 (관리자면 패스)
-    if comment.user_id != current_user.id and not current_user.is_admin:
+    if comment["user_id"] != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="삭제 권한이 없습니다.")
 
     # 3. 삭제
-    db.delete(comment)
+    events.add(db, "comment.deleted", comment_id=comment_id, post_id=comment["post_id"],
+               user_id=comment["user_id"], created_at=comment["created_at"])
     db.commit()
     return
\ No newline at end of file
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import delete, exists, insert, select
 from sqlalchemy.orm import Session
 from database import get_db
-import models, schemas, dependencies
+import models, schemas, dependencies, events, entity_cache, suggestions
 
 router = APIRouter(
     prefix="/follows",
     tags=["Follow (팔로우)"],
 )
 
+def _is_following(db: Session, follower_id: int, following_id: int):
+    return db.scalar(select(exists().where(
+        models.follow_table.c.follower_id == follower_id,
+        models.follow_table.c.following_id == following_id,
+    )))
+
 # ==========================================
 # [API 21] 팔로우 하기 (친구 추가)
 # ==========================================
@@ -21,18 +28,19 @@ def follow_user(
     if target_id == current_user.id:
         raise HTTPException(status_code=400, detail="자기 자신은 팔로우할 수 없습니다.")
 
-    # 2. 상대방 유저가 존재하는지 찾기
-    target_user = db.query(models.User).filter(models.User.id == target_id).first()
+    # 2. 상대방 유저가 존재하는지 찾기 (캐시)
+    target_user = entity_cache.get_user(db, target_id)
     if not target_user:
         raise HTTPException(status_code=404, detail="해당 유저를 찾을 수 없습니다.")
 
     # 3. 이미 팔로우 중인지 체크
-    # (current_user.following 리스트 안에 상대방이 있는지 확인)
-    if target_user in current_user.following:
+    # (팔로잉 목록 전체를 불러오지 않고 한 줄만 확인)
+    if _is_following(db, current_user.id, target_id):
         raise HTTPException(status_code=409, detail="이미 팔로우 중입니다.")
 
     # 4. 팔로우 (내 팔로잉 목록에 상대방 추가)
-    current_user.following.append(target_user)
+    db.execute(insert(models.follow_table).values(follower_id=current_user.id, following_id=target_id))
+    events.add(db, "follow.created", follower_id=current_user.id, following_id=target_id)
     db.commit()
     
     return {"message": "팔로우 성공"}
@@ -46,16 +54,21 @@ def unfollow_user(
     current_user: models.User = Depends(dependencies.get_current_user),
     db: Session = Depends(get_db)
 ):
-    target_user = db.query(models.User).filter(models.User.id == target_id).first()
+    target_user = entity_cache.get_user(db, target_id)
     if not target_user:
         raise HTTPException(status_code=404, detail="유저가 없습니다.")
 
-    # 팔로우 목록에 없으면 에러
-    if target_user not in current_user.following:
+    # 목록에서 제거 (지워진 줄이 없으면 팔로우 중이 아니었던 것)
+    result = db.execute(
+        delete(models.follow_table).where(
+            models.follow_table.c.follower_id == current_user.id,
+            models.follow_table.c.following_id == target_id,
+        )
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=400, detail="팔로우하고 있지 않습니다.")
 
-    # 목록에서 제거
-    current_user.following.remove(target_user)
+    events.add(db, "follow.deleted", follower_id=current_user.id, following_id=target_id)
     db.commit()
     return
 
@@ -75,4 +88,36 @@ def read_followers(
 def read_followings(
     current_user: models.User = Depends(dependencies.get_current_user),
 ):
-    return current_user.following
\ No newline at end of file
+    return current_user.following
+# ==========================================
+# [API 52] 알 수도 있는 사람 (내가 팔로우하는 사람들이 많이 팔로우하는 순)
+# 추천은 배치 작업(suggestions.py)이 미리 Redis에 계산해 둔 것을 꺼내기만 함
+# ==========================================
+@router.get("/suggestions", response_model=list[schemas.FollowSuggestionResponse])
+def read_suggestions(
+    limit: int = Query(10, ge=1, le=suggestions.TOP_K),
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    candidates = suggestions.suggested_ids(current_user.id, suggestions.TOP_K)
+    if not candidates:
+        return []
+    candidate_ids = [user_id for user_id, _ in candidates]
+
+    # 계산 이후에 팔로우한 사람은 빼기 (IN 쿼리 한 번)
+    followed = set(db.scalars(
+        select(models.follow_table.c.following_id).where(
+            models.follow_table.c.follower_id == current_user.id,
+            models.follow_table.c.following_id.in_(candidate_ids),
+        )
+    ))
+    users = {user.id: user for user in db.query(models.User).filter(models.User.id.in_(candidate_ids))}
+
+    result = []
+    for user_id, mutual_count in candidates:
+        if user_id in followed or user_id not in users:
+            continue
+        result.append({"user": users[user_id], "mutual_count": mutual_count})
+        if len(result) == limit:
+            break
+    return result
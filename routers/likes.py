@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
-import models, schemas, dependencies
+import models, schemas, dependencies, events, archive
 
 router = APIRouter(
     prefix="/likes",
@@ -21,11 +22,13 @@ def create_like(
         models.Like.post_id == like.post_id
     ).first()
     
-    if existing_like:
+    # 오래된 좋아요는 보관 저장소로 옮겨졌을 수 있음
+    if existing_like or archive.find(db, "like", current_user.id, like.post_id):
         raise HTTPException(status_code=409, detail="이미 좋아요를 눌렀습니다.")
 
     new_like = models.Like(user_id=current_user.id, post_id=like.post_id)
     db.add(new_like)
+    events.add(db, "like.created", post_id=like.post_id, user_id=current_user.id)
     db.commit()
     db.refresh(new_like)
     return new_like
@@ -42,10 +45,17 @@ def delete_like(
         models.Like.post_id == post_id
     ).first()
     
-    if not like:
-        raise HTTPException(status_code=404, detail="좋아요를 누른 적이 없습니다.")
+    if like:
+        db.delete(like)
+        created_at = like.created_at
+    else:
+        # 원래 테이블에 없으면 보관된 좋아요에서 삭제
+        archived = archive.remove(db, "like", current_user.id, post_id)
+        if not archived:
+            raise HTTPException(status_code=404, detail="좋아요를 누른 적이 없습니다.")
+        created_at = archived["created_at"]
 
-    db.delete(like)
+    events.add(db, "like.deleted", post_id=post_id, user_id=current_user.id, created_at=created_at)
     db.commit()
     return
 
@@ -55,7 +65,16 @@ def read_my_likes(
     current_user: models.User = Depends(dependencies.get_current_user),
     db: Session = Depends(get_db)
 ):
-    return db.query(models.Like).filter(models.Like.user_id == current_user.id).all()
+    likes = db.query(models.Like).filter(models.Like.user_id == current_user.id).all()
+
+    # 오래된 좋아요(보관분)도 이어서 보여줌 (그새 지워진 글은 제외)
+    archived = archive.rows(db, "liked", current_user.id)
+    if archived:
+        alive = set(db.scalars(
+            select(models.Post.id).where(models.Post.id.in_([row["post_id"] for row in archived]))
+        ))
+        likes += [row for row in archived if row["post_id"] in alive]
+    return likes
 
 # ==========================================
 # [API - 31] 특정 게시글에 좋아요 누른 사람 목록 보기
@@ -69,4 +88,12 @@ def read_users_who_liked(
     likes = db.query(models.Like).filter(models.Like.post_id == post_id).all()
     
     # 2. 좋아요 누른 사람(owner)의 정보만 뽑아서 리스트로 준다.
-    return [like.owner for like in likes]
\ No newline at end of file
+    users = [like.owner for like in likes]
+
+    # 3. 오래된 좋아요(보관분)를 누른 사람도 한 번에 불러와 이어 붙인다. (그새 탈퇴한 사람은 제외)
+    archived = archive.rows(db, "like", post_id)
+    if archived:
+        user_ids = [row["user_id"] for row in archived]
+        found = {user.id: user for user in db.scalars(select(models.User).where(models.User.id.in_(user_ids)))}
+        users += [found[user_id] for user_id in user_ids if user_id in found]
+    return users
\ No newline at end of file
@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Optional
+from database import get_db, SessionLocal
+from redis_client import async_client
+import asyncio, json
+import models, schemas, dependencies, notifier
+
+router = APIRouter(
+    prefix="/notifications",
+    tags=["Notification (알림)"],
+)
+
+HEARTBEAT_SECONDS = 15
+
+# ==========================================
+# [API 47] 내 알림 목록 (최근 활동순, 커서: before_id)
+# ==========================================
+@router.get("", response_model=list[schemas.NotificationResponse])
+def read_notifications(
+    before_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    query = db.query(models.Notification).filter(models.Notification.user_id == current_user.id)
+    if before_id is not None:
+        query = query.filter(models.Notification.id < before_id)
+    notifications = query.order_by(models.Notification.id.desc()).limit(limit).all()
+    return [notifier.to_response(db, n) for n in notifications]
+
+# ==========================================
+# [API 48] 안 읽은 알림 개수 (Redis 캐시)
+# ==========================================
+@router.get("/unread-count")
+def read_unread_count(
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    return {"unread_count": notifier.unread_count(db, current_user.id)}
+
+# ==========================================
+# [API 49] 알림 읽음 처리 (notification_id 없으면 전부)
+# ==========================================
+@router.post("/read")
+def read_mark(
+    notification_id: Optional[int] = None,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    updated = notifier.mark_read(db, current_user.id, notification_id)
+    if notification_id is not None and not updated:
+        raise HTTPException(status_code=404, detail="안 읽은 알림이 없습니다.")
+    return {"updated": updated}
+
+# ==========================================
+# [API 50] 실시간 알림 (Server-Sent Events)
+# 폴링 대신 연결 하나 열어두면 새 알림이 올 때 바로 받음
+# ==========================================
+def _sse(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+def _check_user(token: str):
+    with SessionLocal() as db:
+        user = dependencies.get_current_user(token=token, db=db)
+        return user.id, notifier.unread_count(db, user.id)
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    token: str = Depends(dependencies.oauth2_scheme),
+):
+    # 연결이 오래 유지되므로 DB 세션은 로그인 확인할 때만 잠깐 쓰고 닫음 (블로킹이라 스레드에서)
+    user_id, unread = await run_in_threadpool(_check_user, token)
+
+    async def events():
+        client = async_client()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(notifier.CHANNEL.format(user_id))
+            yield _sse("unread", {"unread_count": unread})
+            while not await request.is_disconnected():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=HEARTBEAT_SECONDS)
+                if message is None:
+                    yield ": keep-alive\n\n"  # 프록시가 연결을 끊지 않도록
+                    continue
+                yield _sse("notification", json.loads(message["data"]))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, func, exists
+from sqlalchemy.orm import Session, joinedload, selectinload
 from database import get_db
-import models, schemas, dependencies
+import models, schemas, dependencies, crud, ranking, events, uploads, entity_cache, archive
 import cloudinary
 import cloudinary.uploader
 import os
@@ -15,6 +17,8 @@ cloudinary.config(
   api_secret = os.getenv("CLOUD_API_SECRET") 
 )
 
+MAX_POST_IMAGES = 10
+
 router = APIRouter(
     prefix="/posts",
     tags=["Post (게시글)"],
@@ -30,32 +34,13 @@ async def create_post(
     current_user: models.User = Depends(dependencies.get_current_user),
     db: Session = Depends(get_db)
 ):
-    # [보안 1] 415 에러: 이미지 파일이 아니면 거절
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail="이미지 파일(jpg, png 등)만 업로드 가능합니다."
-        )
-
-    # [보안 2] 413 에러: 파일 크기가 5MB 넘으면 거절
-    file.file.seek(0, 2)
-    file_size = file.file.tell()
-    file.file.seek(0) # 커서를 다시 맨 앞으로 (중요!)
-    
-    if file_size > 5 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail="파일 크기는 5MB를 넘을 수 없습니다."
-        )
-        
-    # [수정됨] Cloudinary로 업로드
+    # [보안 1] 415 에러: 이미지 파일이 아니면 거절 (파일 앞부분으로 판별)
+    # [보안 2] 413 에러: 파일 크기가 5MB 넘으면 읽는 도중에 거절
+    # 같은 사진이 이미 올라가 있으면 Cloudinary 업로드 없이 재사용
     try:
-        # 파일을 클라우드로 전송 (단 한 줄로 끝!)
-        upload_result = cloudinary.uploader.upload(file.file)
-        
-        # 업로드된 인터넷 주소(URL) 가져오기
-        image_url = upload_result.get("secure_url")
-        
+        blob = await uploads.save_upload(db, file, storage="CLOUDINARY")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"업로드 에러: {e}")
         raise HTTPException(status_code=500, detail="이미지 업로드에 실패했습니다.")
@@ -63,40 +48,225 @@ async def create_post(
     # DB에 게시글 정보 저장 (URL은 이제 Cloudinary 주소)
     db_post = models.Post(
         content=content,
-        image_url=image_url, 
+        image_url=blob.url, 
         user_id=current_user.id
     )
+    tags = crud.extract_hashtags(content)
+    db_post.hashtags = crud.get_or_create_hashtags(db, tags)
     
     db.add(db_post)
+    db.flush()  # 게시글 id를 이벤트에 넣기 위해
+    events.add(db, "post.created", post_id=db_post.id, user_id=current_user.id, hashtags=tags)
     db.commit()
     db.refresh(db_post)
     
     return db_post
 
+# ==========================================
+# [API 56] 게시글 작성 (직접 업로드 완료)
+# 사진은 티켓(POST /uploads/tickets)으로 저장소에 이미 올라가 있음 -> 여기선 확인 + 글 저장만
+# ==========================================
+@router.post("/direct", response_model=schemas.PostResponse, status_code=status.HTTP_201_CREATED)
+def create_post_direct(
+    body: schemas.DirectPostCreate,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    # commit 까지 with 안에서 (실패하면 업로드 완료가 되돌려져서 같은 티켓으로 다시 시도 가능)
+    try:
+        with uploads.finalize(db, current_user.id, body.asset_id, body.ticket, purpose="post") as blob:
+            db_post = models.Post(content=body.content, image_url=blob.url, user_id=current_user.id)
+            tags = crud.extract_hashtags(body.content)
+            db_post.hashtags = crud.get_or_create_hashtags(db, tags)
+
+            db.add(db_post)
+            db.flush()
+            events.add(db, "post.created", post_id=db_post.id, user_id=current_user.id, hashtags=tags)
+            db.commit()
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"업로드 완료 확인 에러: {e}")
+        raise HTTPException(status_code=500, detail="이미지 업로드에 실패했습니다.")
+    db.refresh(db_post)
+    return db_post
+
+# ==========================================
+# [API 58] 여러 장 게시글 작성 (최대 10장, 보낸 순서대로)
+# 사진들은 동시에 업로드 -> 10장이어도 가장 느린 1장 만큼만 걸림
+# 하나라도 실패하면 게시글은 안 만들어지고, 이번에 올린 사진도 지움
+# ==========================================
+@router.post("/carousel", response_model=schemas.PostResponse, status_code=status.HTTP_201_CREATED)
+async def create_carousel_post(
+    content: str = Form(None),
+    files: list[UploadFile] = File(...),
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    if len(files) > MAX_POST_IMAGES:
+        raise HTTPException(status_code=400, detail=f"사진은 최대 {MAX_POST_IMAGES}장까지 올릴 수 있습니다.")
+
+    # 글 저장(commit 포함)까지 async with 안에서: 실패하면 이번에 올린 사진도 지움
+    try:
+        async with uploads.save_many(db, files, storage="CLOUDINARY") as blobs:
+            return await run_in_threadpool(_save_carousel_post, db, current_user.id, content, blobs)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"업로드 에러: {e}")
+        raise HTTPException(status_code=500, detail="이미지 업로드에 실패했습니다.")
+
+def _save_carousel_post(db: Session, user_id: int, content: str | None, blobs: list[models.Blob]):
+    # DB 쓰기는 블로킹 + 등록 때 잡은 행 잠금을 들고 있음 -> 스레드에서 바로 commit
+    db_post = models.Post(content=content, image_url=blobs[0].url, user_id=user_id)
+    db_post.media = [models.PostMedia(position=i, image_url=blob.url) for i, blob in enumerate(blobs)]
+    tags = crud.extract_hashtags(content)
+    db_post.hashtags = crud.get_or_create_hashtags(db, tags)
+
+    db.add(db_post)
+    db.flush()
+    events.add(db, "post.created", post_id=db_post.id, user_id=user_id, hashtags=tags)
+    db.commit()
+    db.refresh(db_post)
+    return db_post
+
 # ==========================================
 # [API 5] 게시글 전체 조회 (최신순)
 # ==========================================
-@router.get("", response_model=list[schemas.PostResponse])
-def read_posts(db: Session = Depends(get_db)):
-    return db.query(models.Post).order_by(models.Post.created_at.desc()).all()
+@router.get("", response_model=list[schemas.PostWithCommentsResponse])
+def read_posts(
+    comments: int = Query(0, ge=0, le=20),  # 게시글마다 최신 댓글 미리보기 개수 (0이면 안 붙임)
+    db: Session = Depends(get_db)
+):
+    # 사진 목록은 게시글 수와 상관없이 IN 쿼리 1번
+    posts = (
+        db.query(models.Post)
+        .options(selectinload(models.Post.media))
+        .order_by(models.Post.created_at.desc())
+        .all()
+    )
+
+    # 댓글 미리보기는 게시글 수와 상관없이 쿼리 1번
+    if comments and posts:
+        previews = crud.get_comment_previews(db, [post.id for post in posts], limit=comments)
+        for post in posts:
+            post.comment_preview = previews[post.id]
+    return posts
 
 # ==========================================
 # [API 17] 특정 유저가 쓴 글 모아보기 (프로필용)
 # ==========================================
 @router.get("/user/{user_id}", response_model=list[schemas.PostResponse])
 def read_user_posts(user_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Post).filter(models.Post.user_id == user_id).order_by(models.Post.created_at.desc()).all()
+    return (
+        db.query(models.Post)
+        .options(selectinload(models.Post.media))
+        .filter(models.Post.user_id == user_id)
+        .order_by(models.Post.created_at.desc())
+        .all()
+    )
+
+# ==========================================
+# [API 39] 탐색 탭 (인기순: 최근 좋아요/댓글/북마크 가중치, 시간이 지나면 감쇠)
+# Redis Sorted Set에서 상위 N개 id만 꺼내고, 게시글은 IN 쿼리 한 번
+# ==========================================
+@router.get("/explore", response_model=list[schemas.PostResponse])
+def read_explore(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    post_ids = ranking.top_post_ids(offset, limit)
+    if post_ids is None:
+        # Redis 장애: 최신 글로 대신 보여줌
+        return (
+            db.query(models.Post).options(selectinload(models.Post.media))
+            .order_by(models.Post.id.desc()).offset(offset).limit(limit).all()
+        )
+    if not post_ids:
+        return []
+    posts = {
+        post.id: post
+        for post in db.query(models.Post).options(selectinload(models.Post.media)).filter(models.Post.id.in_(post_ids))
+    }
+    # Redis 순위 그대로 정렬 (그새 지워진 글은 빠짐)
+    return [posts[pid] for pid in post_ids if pid in posts]
 
 # ==========================================
 # [API 18] 게시글 상세 조회
 # ==========================================
 @router.get("/{post_id}", response_model=schemas.PostResponse)
 def read_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    post = entity_cache.get_post(db, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="게시글을 찾을 수 없습니다.")
     return post
 
+# ==========================================
+# [API 38] 게시글 상세 화면 (글 + 작성자 + 개수 + 내 상태 + 댓글 미리보기)
+# 참여(좋아요/댓글) 수와 상관없이 쿼리는 최대 3번 (로그인 확인 제외)
+# ==========================================
+@router.get("/{post_id}/detail", response_model=schemas.PostDetailResponse)
+def read_post_detail(
+    post_id: int,
+    comments: int = Query(3, ge=0, le=20),
+    current_user: models.User = Depends(dependencies.get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    # 1. 게시글 + 작성자 + 사진 목록 (JOIN 한 번)
+    post = (
+        db.query(models.Post)
+        .options(joinedload(models.Post.owner), joinedload(models.Post.media))
+        .filter(models.Post.id == post_id)
+        .first()
+    )
+    if not post:
+        raise HTTPException(status_code=404, detail="게시글을 찾을 수 없습니다.")
+
+    # 2. 개수 + 내 상태 (스칼라 서브쿼리들을 SELECT 한 번에, 보관된 오래된 행 개수도 더함)
+    def count_of(model, kind):
+        live = select(func.count()).where(model.post_id == post_id).scalar_subquery()
+        return live + archive.count_subquery(kind, post_id)
+
+    columns = [
+        count_of(models.Like, "like"), count_of(models.Comment, "comment"), count_of(models.Bookmark, "bookmark"),
+    ]
+    if current_user:
+        columns += [
+            exists().where(models.Like.post_id == post_id, models.Like.user_id == current_user.id),
+            exists().where(models.Bookmark.post_id == post_id, models.Bookmark.user_id == current_user.id),
+            exists().where(
+                models.follow_table.c.follower_id == current_user.id,
+                models.follow_table.c.following_id == post.user_id,
+            ),
+            archive.may_contain("like", current_user.id, post_id),
+            archive.may_contain("bookmark", current_user.id, post_id),
+        ]
+    row = db.execute(select(*columns)).one()
+    liked = bookmarked = False
+    if current_user:
+        # 보관분에 있을 수도 있을 때만 압축을 풀어 확인
+        liked = row[3] or (row[6] and archive.find(db, "like", current_user.id, post_id) is not None)
+        bookmarked = row[4] or (row[7] and archive.find(db, "bookmark", current_user.id, post_id) is not None)
+
+    # 3. 댓글 미리보기
+    preview = crud.get_comment_previews(db, [post_id], limit=comments)[post_id]
+    if not comments:
+        preview["total_count"] = row[1]
+
+    return {
+        "post": post,
+        "owner": post.owner,
+        "like_count": row[0],
+        "comment_count": row[1],
+        "bookmark_count": row[2],
+        "viewer": (
+            {"liked": liked, "bookmarked": bookmarked, "following_owner": row[5]}
+            if current_user else None
+        ),
+        "comments": preview,
+    }
+
 # ==========================================
 # [API 19] 게시글 수정
 # ==========================================
@@ -114,8 +284,15 @@ def update_post(
     if post.user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="수정 권한이 없습니다.")
 
+    old_tags = [tag.name for tag in post.hashtags]
+    new_tags = crud.extract_hashtags(post_update.content)
     post.content = post_update.content
+    post.hashtags = crud.get_or_create_hashtags(db, new_tags)
+    if old_tags != new_tags:
+        events.add(db, "post.updated", post_id=post_id, user_id=post.user_id,
+                   old_hashtags=old_tags, hashtags=new_tags)
     db.commit()
+    entity_cache.invalidate("post", post_id)
     db.refresh(post)
     return post
 
@@ -135,6 +312,13 @@ def delete_post(
     if post.user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="삭제 권한이 없습니다.")
     
+    tags = [tag.name for tag in post.hashtags]
+    images = post.images
     db.delete(post)
+    archive.remove_post(db, post_id)
+    for url in images:  # 여러 장 게시글은 사진마다 참조 (대표 사진은 첫 장과 같은 참조)
+        uploads.release(db, url)
+    events.add(db, "post.deleted", post_id=post_id, user_id=post.user_id, hashtags=tags)
     db.commit()
+    entity_cache.invalidate("post", post_id)
     return
\ No newline at end of file
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session, selectinload
 from database import get_db
-import models, schemas
+import models, schemas, typeahead
 
 router = APIRouter(
     prefix="/search",
@@ -21,7 +21,12 @@ def search_users(keyword: str, db: Session = Depends(get_db)):
 # ==========================================
 @router.get("/posts", response_model=list[schemas.PostResponse])
 def search_posts(keyword: str, db: Session = Depends(get_db)):
-    return db.query(models.Post).filter(models.Post.content.like(f"%{keyword}%")).all()
+    return (
+        db.query(models.Post)
+        .options(selectinload(models.Post.media))
+        .filter(models.Post.content.like(f"%{keyword}%"))
+        .all()
+    )
 
 # ==========================================
 # [API - 추가] 아이디(이메일)로 유저 검색
@@ -29,4 +34,16 @@ def search_posts(keyword: str, db: Session = Depends(get_db)):
 @router.get("/users/id", response_model=list[schemas.UserResponse])
 def search_users_by_email(keyword: str, db: Session = Depends(get_db)):
     # 이메일에 검색어가 포함된 유저를 찾는다. (예: "test" -> test@naver.com 검색됨)
-    return db.query(models.User).filter(models.User.email.like(f"%{keyword}%")).all()
\ No newline at end of file
+    return db.query(models.User).filter(models.User.email.like(f"%{keyword}%")).all()
+
+# ==========================================
+# [API 51] 검색창 자동완성 (입력한 글자로 시작하는 닉네임/해시태그, 인기순)
+# DB LIKE 스캔 대신 Redis 접두어 인덱스에서 바로 꺼냄 (typeahead.py)
+# ==========================================
+@router.get("/autocomplete", response_model=schemas.AutocompleteResponse)
+def autocomplete(
+    q: str = Query(..., min_length=1, max_length=50),
+    type: str = Query("all", pattern="^(all|user|hashtag)$"),
+    limit: int = Query(10, ge=1, le=typeahead.PREFIX_TOP_K),
+):
+    return typeahead.suggest(q, kind=type, limit=limit)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+import models, schemas, dependencies, uploads
+
+router = APIRouter(
+    prefix="/uploads",
+    tags=["Upload (직접 업로드)"],
+)
+
+# ==========================================
+# [API 55] 직접 업로드 티켓 발급
+# 이미지는 API 서버를 거치지 않고 upload_url 로 바로 올림 (Cloudinary 또는 upload_server.py)
+# 다 올리면 asset_id + ticket 으로 POST /posts/direct 또는 PUT /me/image/direct 호출
+# ==========================================
+@router.post("/tickets", response_model=schemas.UploadTicketResponse)
+def create_upload_ticket(
+    body: schemas.UploadTicketCreate,
+    current_user: models.User = Depends(dependencies.get_current_user)
+):
+    return uploads.issue_ticket(current_user.id, body.purpose)
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, status, File, UploadFile, Form
 from fastapi.security import OAuth2PasswordRequestForm  # <--- [중요] 이 줄이 꼭 있어야 합니다!
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from database import get_db
 import schemas, crud, models, dependencies
-import shutil
+import uploads, entity_cache, events
 import os
 
 # 사진 저장 폴더 설정
@@ -43,7 +44,6 @@ def read_users_me(current_user: models.User = Depends(dependencies.get_current_u
 
 # [추가 import] 파일 업로드 기능을 위해 필요
 from fastapi import File, UploadFile, Form
-import shutil
 import os
 
 # 사진 저장 경로 설정 (없으면 만들기)
@@ -53,28 +53,66 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # ==========================================
 # [API 15] 내 프로필 수정 (닉네임, 프사)
 # ==========================================
+def _save_profile(db: Session, user: models.User, nickname: str | None, blob: models.Blob | None):
+    """DB/캐시 쓰기 (블로킹이라 async 엔드포인트에서는 스레드에서 호출)"""
+    # 1. 닉네임 변경 요청이 있으면 수정
+    if nickname and nickname != user.nickname:
+        events.add(db, "user.updated", user_id=user.id, old_nickname=user.nickname, nickname=nickname)
+        user.nickname = nickname
+
+    # 2. 새 사진이 있으면 예전 사진 참조 해제 후 교체
+    if blob is not None:
+        uploads.release(db, user.image_url)
+        user.image_url = blob.url
+
+    db.commit()
+    entity_cache.invalidate("user", user.id)
+    db.refresh(user)
+    return user
+
 @router.patch("/me", response_model=schemas.UserResponse)
-def update_profile(
+async def update_profile(
     nickname: str = Form(None),                  # 닉네임 (선택)
     file: UploadFile = File(None),               # 프로필 사진 (선택)
     current_user: models.User = Depends(dependencies.get_current_user),
     db: Session = Depends(get_db)
 ):
-    # 1. 닉네임 변경 요청이 있으면 수정
-    if nickname:
-        current_user.nickname = nickname
-    
-    # 2. 사진 변경 요청이 있으면 저장 후 수정
-    if file:
-        filename = f"profile_{current_user.id}_{file.filename}"
-        file_path = f"{UPLOAD_DIR}/{filename}"
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        current_user.image_url = f"/static/images/{filename}"
+    # 사진 변경 요청이 있으면 저장 (파일 이름은 안 믿고 내용 해시로 저장 -> 같은 사진은 한 번만, 주소는 영구 캐시)
+    # 업로드만 async, 나머지 DB/캐시 쓰기는 스레드에서
+    blob = await uploads.save_upload(db, file) if file else None
+    return await run_in_threadpool(_save_profile, db, current_user, nickname, blob)
 
-    db.commit()
+# ==========================================
+# [API 42] 프로필 사진만 바꾸기 (본문 = 이미지 바이트 그대로, 스트리밍 저장)
+# multipart 파싱/임시 저장 없이 읽으면서 바로 해시 + 크기 검사 -> 넘으면 즉시 중단
+# ==========================================
+@router.put("/me/image", response_model=schemas.UserResponse)
+async def update_profile_image(
+    request: Request,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    uploads.check_content_length(request.headers.get("content-length"))
+
+    blob = await uploads.save(db, request.stream())
+    return await run_in_threadpool(_save_profile, db, current_user, None, blob)
+
+# ==========================================
+# [API 57] 프로필 사진 바꾸기 (직접 업로드 완료)
+# 사진은 티켓(POST /uploads/tickets)으로 저장소에 이미 올라가 있음 -> 확인 + 주소만 바꿈
+# ==========================================
+@router.put("/me/image/direct", response_model=schemas.UserResponse)
+def update_profile_image_direct(
+    body: schemas.DirectImageUpdate,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    db: Session = Depends(get_db)
+):
+    # commit 까지 with 안에서 (실패하면 업로드 완료가 되돌려져서 같은 티켓으로 다시 시도 가능)
+    with uploads.finalize(db, current_user.id, body.asset_id, body.ticket, purpose="profile") as blob:
+        uploads.release(db, current_user.image_url)
+        current_user.image_url = blob.url
+        db.commit()
+    entity_cache.invalidate("user", current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -88,7 +126,11 @@ def delete_user(
 ):
     # DB에서 나 자신을 삭제
     db.delete(current_user)
+    user_id = current_user.id
+    uploads.release(db, current_user.image_url)
+    events.add(db, "user.deleted", user_id=user_id, nickname=current_user.nickname)
     db.commit()
+    entity_cache.invalidate("user", user_id)
     return
 
 # ==========================================
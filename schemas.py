@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Any, Literal, Optional
 from datetime import datetime  # [중요] 날짜 도구는 맨 위에서 불러와야 함
 
 # [1] 회원가입할 때 받을 데이터
@@ -26,8 +26,9 @@ class Token(BaseModel):
 # [4] 게시글 보여줄 때 양식
 class PostResponse(BaseModel):
     id: int
-    content: str
+    content: Optional[str] = None  # 글 없이 사진만 올릴 수 있음
     image_url: str
+    images: list[str] = []  # 사진 전체 (순서대로, 1장짜리 글은 image_url 1개)
     user_id: int
     created_at: datetime  # 이제 에러 안 날 겁니다
 
@@ -52,6 +53,17 @@ class CommentResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+# [6-1] 게시글별 댓글 미리보기 (최신 N개 + 총 개수)
+class CommentPreviewResponse(BaseModel):
+    post_id: int
+    total_count: int
+    comments: list[CommentResponse]   # 최신순
+    next_cursor: Optional[int] = None # 더 오래된 댓글 불러올 때 before_id로 사용
+
+# [6-2] 목록 조회용 게시글 양식 (댓글 미리보기 포함)
+class PostWithCommentsResponse(PostResponse):
+    comment_preview: Optional[CommentPreviewResponse] = None
         
 # [7] 좋아요/북마크 결과 양식 (구조가 똑같음)
 # [추가] 좋아요/북마크 요청할 때 쓸 양식 (ID만 딱 받음)
@@ -78,4 +90,105 @@ class BookmarkResponse(BaseModel):
         
 # [추가] 게시글 수정할 때 받을 데이터 (사진은 수정 안 하고 내용만)
 class PostUpdate(BaseModel):
-    content: str
\ No newline at end of file
+    content: str
+
+# [8] 게시글 상세 화면 한 번에 보여줄 때 양식
+class UserProfileResponse(BaseModel):
+    id: int
+    nickname: str
+    image_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class ViewerStateResponse(BaseModel):
+    liked: bool
+    bookmarked: bool
+    following_owner: bool
+
+class PostDetailResponse(BaseModel):
+    post: PostResponse
+    owner: UserProfileResponse
+    like_count: int
+    comment_count: int
+    bookmark_count: int
+    viewer: Optional[ViewerStateResponse] = None  # 비로그인이면 null
+    comments: CommentPreviewResponse
+
+
+# [9] 프로파일링 대상 등록 (관리자)
+class ProfilingTargetCreate(BaseModel):
+    path_prefix: Optional[str] = None   # 예: /posts (없으면 모든 경로)
+    user_email: Optional[str] = None    # 특정 유저 요청만
+    count: int = Field(10, ge=1, le=1000)
+    mode: Literal["cprofile", "sample"] = "cprofile"
+    sample_rate: float = Field(1.0, gt=0, le=1)
+
+
+# [10] 알림 보여줄 때 양식
+class NotificationResponse(BaseModel):
+    id: int
+    type: str
+    post_id: Optional[int] = None
+    actor_id: int
+    actor_nickname: str
+    actor_count: int        # 묶인 사람 수 ("X님 외 N명")
+    is_read: bool
+    updated_at: datetime
+    message: str
+
+# [11] 자동완성 응답 양식 (인기순)
+class AutocompleteUser(BaseModel):
+    id: int
+    nickname: str
+    follower_count: int
+
+class AutocompleteHashtag(BaseModel):
+    name: str
+    post_count: int
+
+class AutocompleteResponse(BaseModel):
+    users: list[AutocompleteUser]
+    hashtags: list[AutocompleteHashtag]
+
+# [12] 팔로우 추천 양식
+class FollowSuggestionResponse(BaseModel):
+    user: UserResponse
+    mutual_count: int       # 내가 팔로우하는 사람 중 이 사람을 팔로우하는 수
+
+# [13] 묶음 요청 (/batch) 양식
+class BatchItem(BaseModel):
+    id: Optional[str] = None    # 응답에서 구분용 (없으면 순서로)
+    path: str                   # 예: /posts/user/3?limit=10 (GET만)
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(..., min_length=1, max_length=20)
+
+class BatchItemResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+class BatchResponse(BaseModel):
+    responses: list[BatchItemResponse]
+
+# [14] 직접 업로드 (티켓 발급 -> 저장소로 업로드 -> 완료) 양식
+class UploadTicketCreate(BaseModel):
+    purpose: Literal["post", "profile"]
+
+class UploadTicketResponse(BaseModel):
+    asset_id: str
+    ticket: str                 # 완료할 때 그대로 돌려보냄
+    storage: str                # CLOUDINARY 또는 LOCAL
+    method: str                 # CLOUDINARY: POST (multipart, fields + file) / LOCAL: PUT (본문 = 이미지)
+    upload_url: str
+    fields: dict[str, Any] = {}
+    headers: dict[str, str] = {}  # 업로드 요청에 같이 보낼 헤더 (LOCAL: 티켓 -> 주소에 안 남게)
+    expires_at: int             # 유닉스 시간 (초)
+
+class DirectImageUpdate(BaseModel):
+    asset_id: str
+    ticket: str
+
+class DirectPostCreate(DirectImageUpdate):
+    content: Optional[str] = None
@@ -0,0 +1,189 @@
+"""
+정적 파일 서빙 (/static)
+
+- 미리 압축: 텍스트 파일(html/css/js...)은 서버 시작 때(또는 `python static_assets.py`) .gz / .br 을 옆에 만들어 둠
+  -> 요청마다 압축하지 않고, Accept-Encoding 에 맞는 파일을 그대로 보냄
+- 내용 해시 주소: asset_url("images/a.jpg") -> "/static/images/a.<해시12자리>.jpg"
+  -> 내용이 바뀌면 주소도 바뀌므로 1년짜리 `Cache-Control: immutable` 로 보냄
+- 해시 없는 주소는 `no-cache` (ETag / Last-Modified 로 304 재검증)
+- Range 요청은 Starlette FileResponse 가 처리 (이때는 압축 안 한 원본으로)
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import sys
+from functools import lru_cache
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+try:
+    import brotli  # 선택 설치 (pip install brotli)
+except ImportError:
+    brotli = None
+
+STATIC_DIR = "static"
+STATIC_URL = "/static"
+
+TEXT_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml"}
+MIN_COMPRESS_SIZE = 512             # 이보다 작으면 압축 이득이 거의 없음
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# 폴더 자체가 내용 해시로 저장되는 곳 (uploads.py) -> 주소 그대로 영구 캐시
+IMMUTABLE_DIRS = ("blobs/",)
+# 미리 압축할 때 안 들어가는 폴더 (업로드 사진만 있고 파일 수가 계속 늘어남)
+SKIP_DIRS = {"blobs"}
+
+HASH_LENGTH = 12
+HASHED_NAME = re.compile(rf"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[^./]+)$")
+
+# 선호 순서 (brotli가 더 작음)
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+# ==========================================
+# [1] 미리 압축 (바뀐 파일만 다시)
+# ==========================================
+def _is_stale(source: str, target: str):
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+
+
+def _write_atomic(target: str, payload: bytes):
+    # 워커 여러 개가 동시에 시작해도 반쯤 쓴 파일을 보내지 않도록 임시 파일에 다 쓴 뒤 교체
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(payload)
+    os.replace(tmp_path, target)
+
+
+def _read(path: str):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def precompress(directory: str = STATIC_DIR):
+    written = 0
+    for root, dirs, files in os.walk(directory):
+        if root == directory:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            source = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() not in TEXT_EXTENSIONS:
+                continue
+            if os.path.getsize(source) < MIN_COMPRESS_SIZE:
+                continue
+
+            data = None
+            if _is_stale(source, source + ".gz"):
+                data = _read(source)
+                _write_atomic(source + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                written += 1
+            if brotli is not None and _is_stale(source, source + ".br"):
+                data = data or _read(source)
+                _write_atomic(source + ".br", brotli.compress(data, quality=11))
+                written += 1
+    return written
+
+
+# ==========================================
+# [2] 내용 해시 주소
+# ==========================================
+@lru_cache(maxsize=4096)
+def _file_hash(full_path: str, mtime_ns: int, size: int):
+    # (경로, 수정시각, 크기)가 같으면 다시 읽지 않음
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def file_hash(full_path: str):
+    st = os.stat(full_path)
+    return _file_hash(full_path, st.st_mtime_ns, st.st_size)
+
+
+def asset_url(path: str):
+    """static 폴더 기준 경로 -> 캐시 영구 보관 가능한 주소"""
+    path = path.lstrip("/")
+    stem, ext = os.path.splitext(path)
+    digest = file_hash(os.path.join(STATIC_DIR, path))
+    return f"{STATIC_URL}/{stem}.{digest}{ext}"
+
+
+# ==========================================
+# [3] StaticFiles 확장
+# ==========================================
+def _accepted_encodings(request_headers: Headers):
+    accepted = set()
+    for part in request_headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+class AssetFiles(StaticFiles):
+    async def get_response(self, path: str, scope):
+        # 해시 주소면 진짜 파일로 바꾸고, 해시가 맞을 때만 immutable 로 표시
+        match = HASHED_NAME.match(os.path.basename(path))
+        if match and scope["method"] in ("GET", "HEAD"):
+            real_path = os.path.join(os.path.dirname(path), match["stem"] + match["ext"])
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, real_path)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                digest = _file_hash(full_path, stat_result.st_mtime_ns, stat_result.st_size)
+                if digest == match["hash"]:
+                    return self.file_response(full_path, stat_result, {**scope, "asset_immutable": True})
+        if path.replace(os.sep, "/").startswith(IMMUTABLE_DIRS):
+            scope = {**scope, "asset_immutable": True}
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        headers = {
+            "Cache-Control": IMMUTABLE if scope.get("asset_immutable") else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+
+        # 미리 압축된 파일이 있으면 그걸 보냄 (Range 요청은 원본으로)
+        served_path, served_stat = full_path, stat_result
+        if "range" not in request_headers:
+            accepted = _accepted_encodings(request_headers)
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                try:
+                    candidate_stat = os.stat(f"{full_path}{suffix}")
+                except OSError:
+                    continue
+                if candidate_stat.st_mtime >= stat_result.st_mtime:
+                    served_path, served_stat = f"{full_path}{suffix}", candidate_stat
+                    headers["Content-Encoding"] = encoding
+                    break
+
+        response = FileResponse(
+            served_path,
+            status_code=status_code,
+            stat_result=served_stat,
+            media_type=media_type,
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    # 배포 전 빌드 단계에서 미리 압축: python static_assets.py [폴더]
+    count = precompress(sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR)
+    print(f"압축 파일 {count}개 생성")
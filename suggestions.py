@@ -0,0 +1,184 @@
+"""
+"알 수도 있는 사람" 추천 (팔로우 그래프 희소 행렬 배치 계산)
+
+- follows 테이블 전체를 CSR 희소 행렬 A 로 읽음 (A[i, j] = 1 이면 i가 j를 팔로우)
+- 2단계 후보 점수 = A @ A  (내가 팔로우하는 사람 중 몇 명이 그 사람을 팔로우하는지)
+  -> 행(유저) BATCH_ROWS 개씩 잘라 곱하고, 이미 팔로우 중인 사람/나 자신은 빼고, 행마다 상위 k개만 남김
+- 결과는 Redis Sorted Set suggest:{유저id} 에 저장 -> API는 ZREVRANGE 만 함 (요청마다 그래프 안 훑음)
+- 웹 워커 중 한 곳만 SUGGEST_INTERVAL_SECONDS 마다 계산 (Redis 잠금), 크론으로 `python suggestions.py` 도 가능
+- 성능 확인: `python suggestions.py --benchmark 1000000` (무작위 그래프 100만 간선, Redis 안 씀)
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+from redis_client import rd
+
+KEY_PREFIX = "suggest:"
+LOCK_KEY = "suggest:lock"
+
+TOP_K = 30                          # 유저당 저장할 추천 수
+BATCH_ROWS = 2000                   # 한 번에 곱할 행 수 (메모리 사용량 조절)
+LOAD_CHUNK = 50000                  # DB에서 한 번에 읽을 간선 수
+
+SUGGEST_INTERVAL_SECONDS = 6 * 60 * 60
+SUGGEST_TTL_SECONDS = 2 * SUGGEST_INTERVAL_SECONDS  # 다음 계산이 실패해도 잠깐은 예전 결과를 보여줌
+
+
+# ==========================================
+# [1] 그래프 읽기 -> 희소 행렬
+# ==========================================
+def load_edges(db: Session):
+    """(follower_id, following_id) 배열 (간선 수 x 2)"""
+    result = db.execute(
+        select(models.follow_table.c.follower_id, models.follow_table.c.following_id)
+        .execution_options(yield_per=LOAD_CHUNK)
+    )
+    chunks = [np.array(rows, dtype=np.int64) for rows in result.partitions()]
+    if not chunks:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def build_matrix(edges: np.ndarray):
+    """유저 id -> 0..n-1 로 바꾼 인접 행렬과 id 배열"""
+    ids, index = np.unique(edges.ravel(), return_inverse=True)
+    index = index.reshape(-1, 2)
+    n = len(ids)
+    adjacency = sp.csr_matrix(
+        (np.ones(len(index), dtype=np.float32), (index[:, 0], index[:, 1])), shape=(n, n)
+    )
+    adjacency.sum_duplicates()
+    adjacency.data[:] = 1
+    return adjacency, ids
+
+
+# ==========================================
+# [2] 2단계 후보 + 행별 상위 k (벡터 연산)
+# ==========================================
+def top_candidates(adjacency: sp.csr_matrix, k: int = TOP_K, batch_rows: int = BATCH_ROWS):
+    """배치마다 (행 번호, 후보 번호, 점수) 를 돌려줌. 같은 점수면 팔로워 많은 사람 먼저"""
+    n = adjacency.shape[0]
+    in_degree = np.asarray(adjacency.sum(axis=0)).ravel()
+
+    for start in range(0, n, batch_rows):
+        rows = adjacency[start:start + batch_rows]
+        scores = rows @ adjacency
+        scores = (scores - scores.multiply(rows)).tocoo()  # 이미 팔로우 중인 사람 제외
+
+        row = scores.row.astype(np.int64) + start
+        col = scores.col.astype(np.int64)
+        data = scores.data
+        keep = (data > 0) & (col != row)                   # 나 자신 제외 (맞팔 경로)
+        row, col, data = row[keep], col[keep], data[keep]
+        if not len(row):
+            continue
+
+        order = np.lexsort((-in_degree[col], -data, row))
+        row, col, data = row[order], col[order], data[order]
+        rank = np.arange(len(row)) - np.searchsorted(row, row)
+        keep = rank < k
+        yield row[keep], col[keep], data[keep]
+
+
+# ==========================================
+# [3] 계산 + Redis 저장
+# ==========================================
+def compute(db: Session, k: int = TOP_K):
+    edges = load_edges(db)
+    adjacency, ids = build_matrix(edges)
+    users = 0
+    for row, col, data in top_candidates(adjacency, k):
+        user_ids, candidate_ids = ids[row], ids[col]
+        boundaries = np.flatnonzero(np.diff(row)) + 1
+        pipe = rd.pipeline(transaction=False)
+        for group in np.split(np.arange(len(row)), boundaries):
+            key = f"{KEY_PREFIX}{user_ids[group[0]]}"
+            pipe.delete(key)
+            pipe.zadd(key, dict(zip(candidate_ids[group].tolist(), data[group].tolist())))
+            pipe.expire(key, SUGGEST_TTL_SECONDS)
+            users += 1
+        pipe.execute()
+    return users
+
+
+def suggested_ids(user_id: int, limit: int):
+    """(후보 id, 겹치는 팔로잉 수) 목록, 점수 높은 순"""
+    if rd is None:
+        return []
+    return [(int(member), int(score)) for member, score in
+            rd.zrevrange(f"{KEY_PREFIX}{user_id}", 0, limit - 1, withscores=True)]
+
+
+def _compute_if_due():
+    # 여러 워커 중 주기마다 한 곳만 계산
+    if not rd.set(LOCK_KEY, 1, nx=True, ex=SUGGEST_INTERVAL_SECONDS):
+        return
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        users = compute(db)
+        print(f"팔로우 추천 계산 완료: 유저 {users}명, {time.perf_counter() - started:.1f}초")
+
+
+async def run_forever():
+    if rd is None:
+        return
+    while True:
+        try:
+            await run_in_threadpool(_compute_if_due)
+        except Exception as e:
+            print(f"팔로우 추천 계산 실패: {e}")
+        await asyncio.sleep(SUGGEST_INTERVAL_SECONDS / 6)
+
+
+# ==========================================
+# [4] 벤치마크 (무작위 그래프, 인기 계정에 팔로우가 몰리는 분포)
+# ==========================================
+def benchmark(edge_count: int, users: int | None = None, k: int = TOP_K, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    users = users or max(edge_count // 20, 2)
+    shuffle = rng.permutation(users)                        # 인기 계정 번호를 섞음
+    codes = np.empty(0, dtype=np.int64)
+    while len(codes) < edge_count:                          # 중복/자기 자신 간선을 빼고 개수 채우기
+        size = 2 * (edge_count - len(codes)) + 1000
+        followers = rng.integers(0, users, size)
+        followings = shuffle[np.minimum(rng.zipf(1.5, size) - 1, users - 1)]
+        fresh = (followers * users + followings)[followers != followings]
+        codes = np.unique(np.concatenate([codes, fresh]))
+    codes = rng.permutation(codes)[:edge_count]
+    edges = np.stack([codes // users, codes % users], axis=1)
+
+    started = time.perf_counter()
+    adjacency, _ = build_matrix(edges)
+    built = time.perf_counter()
+    pairs = covered = 0
+    for row, _, _ in top_candidates(adjacency, k):
+        pairs += len(row)
+        covered += len(np.unique(row))
+    done = time.perf_counter()
+
+    print(f"간선 {adjacency.nnz:,}개 / 유저 {adjacency.shape[0]:,}명")
+    print(f"행렬 만들기 {built - started:.2f}초, 추천 계산 {done - built:.2f}초")
+    print(f"추천 받은 유저 {covered:,}명, 추천 {pairs:,}건 (유저당 최대 {k}개)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="팔로우 추천 배치 계산")
+    parser.add_argument("--benchmark", type=int, metavar="EDGES", help="DB 대신 무작위 그래프로 속도만 측정")
+    parser.add_argument("--users", type=int, help="벤치마크 유저 수 (기본: 간선 수 / 20)")
+    parser.add_argument("-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.users, args.k)
+    else:
+        with SessionLocal() as db:
+            print(f"유저 {compute(db, args.k)}명 추천 저장")
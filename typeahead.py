@@ -0,0 +1,258 @@
+"""
+닉네임/해시태그 자동완성 (Redis 접두어 인덱스)
+
+- 접두어마다 Sorted Set 하나: ac:user:{접두어}, ac:tag:{접두어}
+  점수 = 인기도 (유저: 팔로워 수, 태그: 사용된 게시글 수), 접두어당 상위 PREFIX_TOP_K 개만 유지
+- 조회: ZREVRANGE 한 번 (O(log n + k)) -> LIKE '%kw%' 스캔 없음
+- 갱신: 이벤트(events.py) 컨슈머 그룹 "typeahead" 가 가입/닉네임 변경/팔로우/해시태그 사용을 반영
+- 빠질 때(탈퇴/닉네임 변경/태그 사용 0): 상위 k개로 잘라 두었던 접두어가 k개보다 줄면
+  DB에서 그 접두어 상위 k개를 다시 채움 (잘려 나갔던 다음 순위가 돌아오도록)
+"""
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import entity_cache
+import models
+from database import SessionLocal
+from redis_client import rd
+
+USER_PREFIX = "ac:user:"
+TAG_PREFIX = "ac:tag:"
+READY_KEY = "ac:ready"              # 전체 재구성이 끝났는지 표시
+REBUILD_LOCK_KEY = "ac:rebuilding"   # 워커 한 곳만 재구성
+
+REBUILD_CHECK_SECONDS = 60          # 인덱스가 사라졌는지(Redis flush/재시작) 확인 주기
+MAX_PREFIX_LENGTH = 20              # 이보다 긴 입력은 앞 20자로 찾고 걸러냄
+PREFIX_TOP_K = 50                   # 접두어별로 들고 있는 후보 수
+
+
+def _normalize(text: str):
+    return (text or "").strip().lower()
+
+
+def _prefixes(text: str):
+    text = _normalize(text)[:MAX_PREFIX_LENGTH]
+    return [text[:i] for i in range(1, len(text) + 1)]
+
+
+def _user_member(user_id: int, nickname: str):
+    return f"{user_id}:{nickname}"
+
+
+# ==========================================
+# [1] 인덱스 쓰기
+# ==========================================
+def _add(pipe, key_prefix: str, text: str, member: str, score: float):
+    for prefix in _prefixes(text):
+        key = key_prefix + prefix
+        pipe.zadd(key, {member: score})
+        pipe.zremrangebyrank(key, 0, -(PREFIX_TOP_K + 1))
+
+
+def _remove(pipe, key_prefix: str, text: str, member: str):
+    for prefix in _prefixes(text):
+        pipe.zrem(key_prefix + prefix, member)
+
+
+def index_user(user_id: int, nickname: str, follower_count: int, old_nickname: str | None = None,
+               db: Session | None = None):
+    pipe = rd.pipeline(transaction=False)
+    if old_nickname is not None:
+        _remove(pipe, USER_PREFIX, old_nickname, _user_member(user_id, old_nickname))
+    _add(pipe, USER_PREFIX, nickname, _user_member(user_id, nickname), follower_count)
+    pipe.execute()
+    if old_nickname is not None and db is not None:
+        refill(db, USER_PREFIX, _prefixes(old_nickname))
+
+
+def remove_user(user_id: int, nickname: str, db: Session | None = None):
+    pipe = rd.pipeline(transaction=False)
+    _remove(pipe, USER_PREFIX, nickname, _user_member(user_id, nickname))
+    pipe.execute()
+    if db is not None:
+        refill(db, USER_PREFIX, _prefixes(nickname))
+
+
+def index_tag(name: str, usage_count: int, db: Session | None = None):
+    pipe = rd.pipeline(transaction=False)
+    if usage_count > 0:
+        _add(pipe, TAG_PREFIX, name, name, usage_count)
+    else:
+        _remove(pipe, TAG_PREFIX, name, name)
+    pipe.execute()
+    if usage_count <= 0 and db is not None:
+        refill(db, TAG_PREFIX, _prefixes(name))
+
+
+def _top_users(db: Session, prefix: str):
+    follower_count = func.count(models.follow_table.c.follower_id)
+    rows = (
+        db.query(models.User.id, models.User.nickname, follower_count)
+        .outerjoin(models.follow_table, models.follow_table.c.following_id == models.User.id)
+        .filter(models.User.nickname.startswith(prefix, autoescape=True))
+        .group_by(models.User.id, models.User.nickname)
+        .order_by(follower_count.desc())
+        .limit(PREFIX_TOP_K)
+        .all()
+    )
+    return {_user_member(user_id, nickname): count for user_id, nickname, count in rows}
+
+
+def _top_tags(db: Session, prefix: str):
+    post_count = func.count(models.post_hashtags.c.post_id)
+    rows = (
+        db.query(models.Hashtag.name, post_count)
+        .join(models.post_hashtags, models.post_hashtags.c.hashtag_id == models.Hashtag.id)
+        .filter(models.Hashtag.name.startswith(prefix, autoescape=True))
+        .group_by(models.Hashtag.name)
+        .order_by(post_count.desc())
+        .limit(PREFIX_TOP_K)
+        .all()
+    )
+    return dict(rows)
+
+
+def refill(db: Session, key_prefix: str, prefixes: list[str]):
+    """k개보다 줄어든 접두어만 DB 상위 k개로 다시 채움 (빠지는 일은 드물어서 요청 경로 밖 컨슈머에서만)"""
+    pipe = rd.pipeline(transaction=False)
+    for prefix in prefixes:
+        pipe.zcard(key_prefix + prefix)
+    short = [prefix for prefix, size in zip(prefixes, pipe.execute()) if size < PREFIX_TOP_K]
+    if not short:
+        return 0
+
+    top = _top_users if key_prefix == USER_PREFIX else _top_tags
+    pipe = rd.pipeline(transaction=False)
+    for prefix in short:
+        members = top(db, prefix)
+        if members:
+            pipe.zadd(key_prefix + prefix, members)
+            pipe.zremrangebyrank(key_prefix + prefix, 0, -(PREFIX_TOP_K + 1))
+    pipe.execute()
+    return len(short)
+
+
+# ==========================================
+# [2] 조회 (상위 k개)
+# ==========================================
+def suggest(q: str, kind: str = "all", limit: int = 10):
+    q = _normalize(q).lstrip("#")
+    result = {"users": [], "hashtags": []}
+    if not q or rd is None:
+        return result
+    prefix = q[:MAX_PREFIX_LENGTH]
+    exact = len(q) <= MAX_PREFIX_LENGTH
+    fetch = limit if exact else PREFIX_TOP_K
+
+    pipe = rd.pipeline(transaction=False)
+    if kind in ("all", "user"):
+        pipe.zrevrange(USER_PREFIX + prefix, 0, fetch - 1, withscores=True)
+    if kind in ("all", "hashtag"):
+        pipe.zrevrange(TAG_PREFIX + prefix, 0, fetch - 1, withscores=True)
+    responses = iter(pipe.execute())
+
+    if kind in ("all", "user"):
+        for member, score in next(responses):
+            user_id, _, nickname = member.partition(":")
+            if exact or nickname.lower().startswith(q):
+                result["users"].append({"id": int(user_id), "nickname": nickname, "follower_count": int(score)})
+    if kind in ("all", "hashtag"):
+        for name, score in next(responses):
+            if exact or name.startswith(q):
+                result["hashtags"].append({"name": name, "post_count": int(score)})
+    result["users"] = result["users"][:limit]
+    result["hashtags"] = result["hashtags"][:limit]
+    return result
+
+
+# ==========================================
+# [3] 이벤트 반영 (컨슈머 그룹: typeahead)
+# 점수는 DB에서 다시 세어 넣으므로 같은 이벤트가 두 번 와도 결과가 같음
+# ==========================================
+def _follower_count(db: Session, user_id: int):
+    return db.query(func.count()).select_from(models.follow_table).filter(
+        models.follow_table.c.following_id == user_id
+    ).scalar()
+
+
+def _tag_counts(db: Session, names: list[str]):
+    rows = (
+        db.query(models.Hashtag.name, func.count(models.post_hashtags.c.post_id))
+        .outerjoin(models.post_hashtags, models.post_hashtags.c.hashtag_id == models.Hashtag.id)
+        .filter(models.Hashtag.name.in_(names))
+        .group_by(models.Hashtag.name)
+        .all()
+    )
+    counts = dict.fromkeys(names, 0)
+    counts.update(rows)
+    return counts
+
+
+def handle_event(event: dict):
+    event_type = event["type"]
+    payload = event["payload"]
+    with SessionLocal() as db:
+        if event_type == "user.created":
+            index_user(payload["user_id"], payload["nickname"], 0)
+        elif event_type == "user.updated":
+            index_user(payload["user_id"], payload["nickname"], _follower_count(db, payload["user_id"]),
+                       old_nickname=payload["old_nickname"], db=db)
+        elif event_type == "user.deleted":
+            remove_user(payload["user_id"], payload["nickname"], db=db)
+        elif event_type in ("follow.created", "follow.deleted"):
+            user = entity_cache.get_user(db, payload["following_id"])
+            if user:
+                index_user(user["id"], user["nickname"], _follower_count(db, user["id"]))
+        elif event_type in ("post.created", "post.updated", "post.deleted"):
+            names = set(payload.get("hashtags", [])) | set(payload.get("old_hashtags", []))
+            if names:
+                for name, count in _tag_counts(db, list(names)).items():
+                    index_tag(name, count, db=db)
+
+
+# ==========================================
+# [4] 전체 재구성 (Redis가 비었을 때)
+# ==========================================
+def rebuild(db: Session):
+    followers = dict(
+        db.query(models.follow_table.c.following_id, func.count())
+        .group_by(models.follow_table.c.following_id)
+        .all()
+    )
+    for user_id, nickname in db.query(models.User.id, models.User.nickname).yield_per(5000):
+        if nickname:
+            index_user(user_id, nickname, followers.get(user_id, 0))
+
+    tag_counts = (
+        db.query(models.Hashtag.name, func.count(models.post_hashtags.c.post_id))
+        .join(models.post_hashtags, models.post_hashtags.c.hashtag_id == models.Hashtag.id)
+        .group_by(models.Hashtag.name)
+        .all()
+    )
+    for name, count in tag_counts:
+        index_tag(name, count)
+    rd.set(READY_KEY, 1)
+
+
+def _rebuild_if_missing():
+    if not rd.exists(READY_KEY) and rd.set(REBUILD_LOCK_KEY, 1, nx=True, ex=10 * 60):
+        try:
+            with SessionLocal() as db:
+                rebuild(db)
+        finally:
+            rd.delete(REBUILD_LOCK_KEY)
+
+
+async def run_rebuild_if_missing():
+    # 서버가 도는 중에 Redis 가 비워져도 다시 채우도록 주기적으로 확인
+    if rd is None:
+        return
+    while True:
+        try:
+            await run_in_threadpool(_rebuild_if_missing)
+        except Exception as e:
+            print(f"자동완성 인덱스 재구성 실패: {e}")
+        await asyncio.sleep(REBUILD_CHECK_SECONDS)
@@ -0,0 +1,47 @@
+"""
+로컬 업로드 서버 (Cloudinary 대신 쓰는 직접 업로드 받는 곳)
+
+- Cloudinary 설정이 없을 때(로컬/테스트) 티켓의 upload_url 이 여기를 가리킴
+- API 서버와 따로 실행: `uvicorn upload_server:app --port 8001`
+  -> 큰 파일을 받는 동안 API 워커가 붙잡히지 않음
+- PUT /upload/{asset_id} (헤더 X-Upload-Ticket: 티켓) 본문 = 이미지 바이트 그대로
+  티켓은 쿼리스트링에 넣지 않음 (접근 로그에 남아서 replay.py 등으로 새어 나감)
+  받으면서 SHA-256/크기/형식을 계산해 incoming/{asset_id}.json 에 남김 -> API는 완료 때 이것만 읽음
+"""
+import json
+import os
+
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import uploads
+
+
+async def receive_upload(request: Request):
+    asset_id = request.path_params["asset_id"]
+    try:
+        claims = uploads.read_ticket(request.headers.get(uploads.TICKET_HEADER, ""))
+        if claims["aid"] != asset_id or claims["storage"] != "LOCAL":
+            raise HTTPException(status_code=403, detail="이 업로드 티켓을 쓸 수 없습니다.")
+        uploads.check_content_length(request.headers.get("content-length"))
+        meta = await _store(asset_id, request.stream())
+    except HTTPException as e:
+        return JSONResponse({"detail": e.detail}, status_code=e.status_code)
+    return JSONResponse({"asset_id": asset_id, "size": meta["size"], "content_type": meta["content_type"]})
+
+
+async def _store(asset_id: str, chunks):
+    tmp_path, sha, size, content_type, ext = await uploads.receive(chunks, uploads.INCOMING_DIR)
+    # 같은 티켓으로 다시 올리면 덮어씀 (완료 전까지)
+    path = uploads.incoming_path(asset_id)
+    os.replace(tmp_path, path)
+    meta = {"sha256": sha, "size": size, "content_type": content_type, "ext": ext}
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+app = Starlette(routes=[Route("/upload/{asset_id}", receive_upload, methods=["PUT"])])
@@ -0,0 +1,541 @@
+"""
+업로드 저장소 (내용 주소 방식)
+
+- 업로드 본문을 64KB씩 읽으면서 바로 SHA-256 계산 + 임시 파일에 씀
+- 크기 제한은 읽는 도중에 검사 -> 넘는 순간 중단 (413)
+- 파일 종류는 클라이언트가 보낸 이름/타입이 아니라 앞부분 바이트로 판별 (415)
+- 저장 이름 = 내용 해시 -> 같은 사진은 한 번만 저장하고 ref_count 로 참조 수 관리
+- ref_count 가 0이 된 파일은 유예 시간 뒤 백그라운드에서 삭제 (run_gc)
+- 여러 장(save_many): 받기/저장소 업로드는 동시에 (UPLOAD_CONCURRENCY 만큼), DB 등록은 하나의 세션에서 차례대로 (스레드에서)
+  -> 하나라도 실패하면(호출한 쪽 commit 실패 포함) 이번에 새로 올린 파일은 지우고 에러 (일부만 올라간 게시글이 생기지 않음)
+- 직접 업로드(티켓): API는 서명된 티켓만 발급하고, 이미지는 클라이언트가 저장소(Cloudinary / upload_server.py)로 바로 올림
+  -> 완료(finalize) 때 저장소가 알려준 크기/형식/해시만 확인 (API 워커는 이미지 바이트를 읽지 않음)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+
+import cloudinary
+import cloudinary.api
+import cloudinary.uploader
+import cloudinary.utils
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import dependencies
+import models
+import static_assets
+from database import SessionLocal
+from redis_client import rd
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+BLOB_DIR = os.path.join(static_assets.STATIC_DIR, "blobs")
+TMP_DIR = os.path.join(BLOB_DIR, "tmp")
+
+UPLOAD_CONCURRENCY = 16            # 이 프로세스에서 동시에 저장소로 올리는 파일 수 (요청 전체 합)
+_upload_slots = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+GC_GRACE_SECONDS = 60 * 60          # 참조가 0이 되고 1시간 지난 파일만 삭제
+GC_INTERVAL_SECONDS = 60 * 60
+
+TICKET_TTL_SECONDS = 15 * 60        # 티켓 발급 후 업로드 + 완료까지
+INCOMING_DIR = os.path.join(BLOB_DIR, "incoming")   # upload_server.py 가 받은 파일 (완료 전)
+UPLOAD_SERVER_URL = os.getenv("UPLOAD_SERVER_URL", "http://127.0.0.1:8001")
+PENDING_TAG = "pending"             # Cloudinary: 완료 안 된 업로드 표시 (청소 대상)
+TICKET_HEADER = "X-Upload-Ticket"   # LOCAL: 티켓은 헤더로 (쿼리스트링이면 접근 로그에 남음)
+ALLOWED_FORMATS = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+
+# 앞부분 바이트(매직 넘버) -> (content_type, 확장자)
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"GIF87a", "image/gif", ".gif"),
+    (b"GIF89a", "image/gif", ".gif"),
+]
+_SNIFF_BYTES = 12
+
+
+def sniff_image(head: bytes):
+    for signature, content_type, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type, ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    return None
+
+
+def _too_large():
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"파일 크기는 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB를 넘을 수 없습니다.",
+    )
+
+
+def _not_image():
+    return HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="이미지 파일(jpg, png, gif, webp)만 업로드 가능합니다.",
+    )
+
+
+def check_content_length(value: str | None, max_bytes: int = MAX_UPLOAD_BYTES):
+    """본문을 읽기 전에 Content-Length 만 보고 바로 거절"""
+    if value and value.isdigit() and int(value) > max_bytes:
+        raise _too_large()
+
+
+async def iter_upload_file(file: UploadFile):
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+# ==========================================
+# [1] 저장 (스트리밍 + 해시 + 중복 제거)
+# ==========================================
+async def receive(chunks, directory: str = TMP_DIR, max_bytes: int = MAX_UPLOAD_BYTES):
+    """chunks(비동기 바이트 이터레이터)를 임시 파일로 받으면서 해시/형식 확인
+    -> (임시 경로, sha256, 크기, content_type, 확장자). 실패하면 임시 파일은 지움"""
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    detected = None
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".part-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large()
+                if detected is None:
+                    head += chunk[:_SNIFF_BYTES]
+                    if len(head) >= _SNIFF_BYTES:
+                        detected = sniff_image(head) or False
+                        if not detected:
+                            raise _not_image()
+                digest.update(chunk)
+                out.write(chunk)
+
+        if not detected:
+            detected = sniff_image(head)
+            if not detected:
+                raise _not_image()
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    content_type, ext = detected
+    return tmp_path, digest.hexdigest(), size, content_type, ext
+
+
+async def save(db: Session, chunks, storage: str = "LOCAL", max_bytes: int = MAX_UPLOAD_BYTES):
+    """chunks를 저장하고 참조 수 +1 된 Blob 을 돌려줌 (commit은 호출한 쪽에서)"""
+    tmp_path, sha, size, content_type, ext = await receive(chunks, TMP_DIR, max_bytes)
+    try:
+        return await run_in_threadpool(_acquire, db, sha, size, content_type, ext, storage, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def save_upload(db: Session, file: UploadFile, storage: str = "LOCAL"):
+    return await save(db, iter_upload_file(file), storage=storage)
+
+
+def _local_path(sha: str, ext: str):
+    return os.path.join(BLOB_DIR, sha[:2], sha + ext)
+
+
+def _put(sha: str, ext: str, storage: str, tmp_path: str):
+    """실제 저장소에 파일을 놓고 (storage_key, url) 반환"""
+    if storage == "CLOUDINARY":
+        result = cloudinary.uploader.upload(tmp_path, public_id=sha, overwrite=False)
+        return result["public_id"], result["secure_url"]
+
+    path = _local_path(sha, ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    return path, f"{static_assets.STATIC_URL}/blobs/{sha[:2]}/{sha}{ext}"
+
+
+def _missing_locally(blob: models.Blob):
+    return blob.storage == "LOCAL" and not os.path.exists(blob.storage_key)
+
+
+def _add_ref(db: Session, blob: models.Blob):
+    blob.ref_count = models.Blob.ref_count + 1
+    db.flush()
+    db.refresh(blob)
+    return blob
+
+
+def _insert(db: Session, sha: str, size: int, content_type: str, storage: str, storage_key: str, url: str):
+    blob = models.Blob(
+        sha256=sha, size=size, content_type=content_type,
+        storage=storage, storage_key=storage_key, url=url, ref_count=1,
+    )
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # 같은 파일이 동시에 올라온 경우: 먼저 들어간 행의 참조 수만 올림
+        blob = db.get(models.Blob, sha, with_for_update=True, populate_existing=True)
+        _add_ref(db, blob)
+    return blob
+
+
+def _acquire(db: Session, sha: str, size: int, content_type: str, ext: str, storage: str, tmp_path: str):
+    blob = db.get(models.Blob, sha, with_for_update=True)
+    if blob is not None:
+        if _missing_locally(blob):
+            _put(sha, ext, blob.storage, tmp_path)
+        return _add_ref(db, blob)
+
+    storage_key, url = _put(sha, ext, storage, tmp_path)
+    return _insert(db, sha, size, content_type, storage, storage_key, url)
+
+
+@asynccontextmanager
+async def save_many(db: Session, files: list[UploadFile], storage: str = "LOCAL"):
+    """여러 파일을 동시에 받아 저장 -> 파일 순서대로 Blob 목록을 넘겨줌. async with 블록 안에서 commit 까지 해야 함
+    저장이나 블록이 실패하면(commit 실패 포함) 세션을 되돌리고, 이번에 새로 올린 파일은 지운 뒤 에러를 그대로 올림
+    (새로 올린 파일은 Blob 행이 없어서 청소(collect_garbage)로는 안 지워짐)"""
+    received = await asyncio.gather(*(receive(iter_upload_file(f)) for f in files), return_exceptions=True)
+    uploaded = {}  # sha -> (storage, storage_key, url): 이번 요청이 저장소에 새로 올린 파일
+
+    async def upload(sha, ext, target, tmp_path):
+        async with _upload_slots:
+            storage_key, url = await run_in_threadpool(_put, sha, ext, target, tmp_path)
+        uploaded[sha] = (target, storage_key, url)
+
+    try:
+        for item in received:
+            if isinstance(item, BaseException):
+                raise item
+
+        # 저장소에 없는 것만, 같은 사진은 한 번만 올림 (DB 조회는 한 번)
+        shas = {sha for _, sha, _, _, _ in received}
+        existing = await run_in_threadpool(_existing_blobs, db, shas)
+        pending = {}
+        for tmp_path, sha, _, _, ext in received:
+            blob = existing.get(sha)
+            if sha not in pending and (blob is None or _missing_locally(blob)):
+                pending[sha] = (ext, blob.storage if blob else storage, tmp_path)
+        results = await asyncio.gather(
+            *(upload(sha, *args) for sha, args in pending.items()), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        # 등록(행 잠금 + 드물게 업로드)은 블로킹이라 스레드에서
+        blobs = await run_in_threadpool(_register_all, db, received, uploaded, storage)
+        yield blobs
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        await run_in_threadpool(_discard, db, uploaded)
+        raise
+    finally:
+        for item in received:
+            if not isinstance(item, BaseException) and os.path.exists(item[0]):
+                os.remove(item[0])
+
+
+def _existing_blobs(db: Session, shas: set):
+    return {blob.sha256: blob for blob in db.query(models.Blob).filter(models.Blob.sha256.in_(shas))}
+
+
+def _register_all(db: Session, received: list, uploaded: dict, storage: str):
+    """세션 하나로 차례대로 등록 (참조 수는 사진마다 +1)"""
+    blobs = []
+    for tmp_path, sha, size, content_type, ext in received:
+        blob = db.get(models.Blob, sha, with_for_update=True)
+        if blob is not None:
+            blobs.append(_add_ref(db, blob))
+        elif sha in uploaded:
+            blobs.append(_insert(db, sha, size, content_type, *uploaded[sha]))
+        else:
+            # 조회한 뒤 그 사이 청소된 경우: 지금 올림
+            blobs.append(_acquire(db, sha, size, content_type, ext, storage, tmp_path))
+    return blobs
+
+
+def _discard(db: Session, uploaded: dict):
+    # 그 사이 다른 요청이 같은 사진을 등록했으면 남겨 둠 (저장소 키가 내용 해시라 같은 파일)
+    if not uploaded:
+        return
+    kept = {sha for (sha,) in db.query(models.Blob.sha256).filter(models.Blob.sha256.in_(list(uploaded)))}
+    for sha, (storage, storage_key, _) in uploaded.items():
+        if sha in kept:
+            continue
+        try:
+            _remove_stored(storage, storage_key)
+        except Exception as e:
+            print(f"업로드 파일 삭제 실패 ({storage_key}): {e}")
+
+
+# ==========================================
+# [2] 참조 해제 (게시글 삭제, 프로필 사진 교체 등)
+# ==========================================
+def release(db: Session, url: str | None):
+    if not url:
+        return
+    db.query(models.Blob).filter(models.Blob.url == url).update(
+        {models.Blob.ref_count: models.Blob.ref_count - 1, models.Blob.updated_at: datetime.now()},
+        synchronize_session=False,
+    )
+
+
+# ==========================================
+# [3] 청소 (참조 0 + 유예 시간 지난 파일 삭제)
+# ==========================================
+def _remove_stored(storage: str, storage_key: str):
+    if storage == "CLOUDINARY":
+        cloudinary.uploader.destroy(storage_key)
+    elif os.path.exists(storage_key):
+        os.remove(storage_key)
+
+
+def collect_garbage(db: Session, grace_seconds: int = GC_GRACE_SECONDS, batch_size: int = 500):
+    cutoff = datetime.now() - timedelta(seconds=grace_seconds)
+    removed = 0
+    candidates = (
+        db.query(models.Blob.sha256, models.Blob.storage, models.Blob.storage_key)
+        .filter(models.Blob.ref_count <= 0, models.Blob.updated_at < cutoff)
+        .limit(batch_size)
+        .all()
+    )
+    for sha, storage, storage_key in candidates:
+        # 행을 잠근 채로 파일부터 지우고 commit
+        # -> 같은 사진을 올리는 요청(_acquire)은 잠금을 기다렸다가 행이 없으면 새로 올림
+        #    (commit 먼저 하면 그 사이 다시 등록된 파일을 지워버릴 수 있음)
+        blob = db.get(models.Blob, sha, with_for_update=True, populate_existing=True)
+        if blob is None or blob.ref_count > 0:  # 그 사이 다시 참조됐으면 건너뜀
+            db.rollback()
+            continue
+        try:
+            _remove_stored(storage, storage_key)
+        except Exception as e:
+            print(f"업로드 파일 삭제 실패 ({storage_key}): {e}")
+            db.rollback()  # 행은 남겨 두고 다음 청소 때 다시 시도
+            continue
+        db.delete(blob)
+        db.commit()
+        removed += 1
+    return removed
+
+
+def collect_abandoned_uploads(grace_seconds: int = GC_GRACE_SECONDS):
+    """티켓으로 올렸지만 완료하지 않은 파일 삭제"""
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    if os.path.isdir(INCOMING_DIR):
+        for name in os.listdir(INCOMING_DIR):
+            path = os.path.join(INCOMING_DIR, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    if direct_storage() == "CLOUDINARY":
+        pending = cloudinary.api.resources_by_tag(PENDING_TAG, max_results=500).get("resources", [])
+        stale = [
+            r["public_id"] for r in pending
+            if datetime.fromisoformat(r["created_at"].replace("Z", "+00:00")).timestamp() < cutoff
+        ]
+        if stale:
+            cloudinary.api.delete_resources(stale)
+            removed += len(stale)
+    return removed
+
+
+def _collect():
+    with SessionLocal() as db:
+        removed = collect_garbage(db)
+    return removed + collect_abandoned_uploads()
+
+
+async def run_gc():
+    while True:
+        try:
+            await run_in_threadpool(_collect)
+        except Exception as e:
+            print(f"업로드 청소 실패: {e}")
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+
+
+# ==========================================
+# [4] 직접 업로드 티켓 (발급 -> 클라이언트가 저장소로 업로드 -> 완료 확인)
+# ==========================================
+def direct_storage():
+    # Cloudinary 설정이 있으면 Cloudinary, 없으면(로컬/테스트) upload_server.py
+    return "CLOUDINARY" if cloudinary.config().cloud_name else "LOCAL"
+
+
+def issue_ticket(user_id: int, purpose: str):
+    asset_id = f"u{user_id}-{uuid.uuid4().hex}"
+    expires_at = int(time.time()) + TICKET_TTL_SECONDS
+    storage = direct_storage()
+    ticket = jwt.encode(
+        {"sub": str(user_id), "aid": asset_id, "purpose": purpose, "storage": storage, "exp": expires_at},
+        dependencies.SECRET_KEY, algorithm=dependencies.ALGORITHM,
+    )
+
+    if storage == "CLOUDINARY":
+        config = cloudinary.config()
+        fields = {
+            "public_id": asset_id,
+            "timestamp": int(time.time()),
+            "tags": PENDING_TAG,
+            "allowed_formats": ",".join(ALLOWED_FORMATS),
+        }
+        fields["signature"] = cloudinary.utils.api_sign_request(fields, config.api_secret)
+        fields["api_key"] = config.api_key
+        return {
+            "asset_id": asset_id, "ticket": ticket, "storage": storage, "expires_at": expires_at,
+            "method": "POST", "upload_url": f"https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload",
+            "fields": fields,
+        }
+
+    return {
+        "asset_id": asset_id, "ticket": ticket, "storage": storage, "expires_at": expires_at,
+        "method": "PUT", "upload_url": f"{UPLOAD_SERVER_URL}/upload/{asset_id}",
+        "fields": {}, "headers": {TICKET_HEADER: ticket},
+    }
+
+
+def read_ticket(ticket: str):
+    """티켓 검증 -> 내용 (서명/만료 확인). upload_server.py 도 같이 씀"""
+    try:
+        return jwt.decode(ticket, dependencies.SECRET_KEY, algorithms=[dependencies.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="업로드 티켓이 유효하지 않거나 만료되었습니다.")
+
+
+def incoming_path(asset_id: str):
+    return os.path.join(INCOMING_DIR, asset_id)
+
+
+@contextmanager
+def finalize(db: Session, user_id: int, asset_id: str, ticket: str, purpose: str):
+    """업로드 완료 확인 -> 참조 수 +1 된 Blob 을 넘겨줌. with 블록 안에서 commit 까지 해야 함
+    블록이 실패하면(commit 실패 포함) 롤백하고 완료 표시와 옮긴 파일을 되돌림 -> 같은 티켓으로 다시 시도 가능
+    받은 파일 정리(로컬 incoming 삭제, Cloudinary 중복 삭제/pending 표시 해제)는 commit 뒤에만 함"""
+    claims = read_ticket(ticket)
+    if claims["aid"] != asset_id or claims["sub"] != str(user_id) or claims["purpose"] != purpose:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="이 업로드 티켓을 쓸 수 없습니다.")
+    # 같은 티켓으로 두 번 완료하지 않도록 (실패하면 다시 시도할 수 있게 풀어줌)
+    done_key = f"upload:done:{asset_id}"
+    if rd is not None and not rd.set(done_key, 1, nx=True, ex=TICKET_TTL_SECONDS):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="이미 완료된 업로드입니다.")
+    local = claims["storage"] != "CLOUDINARY"
+    try:
+        blob = _finalize_local(db, asset_id) if local else _finalize_cloudinary(db, asset_id)
+        yield blob
+    except BaseException:
+        db.rollback()
+        if local:
+            _restore_incoming(db, asset_id)
+        if rd is not None:
+            rd.delete(done_key)
+        raise
+
+    try:
+        if local:
+            for leftover in (incoming_path(asset_id), incoming_path(asset_id) + ".json"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        elif blob.storage_key == asset_id:
+            cloudinary.uploader.remove_tag(PENDING_TAG, [asset_id])  # 청소 대상에서 뺌
+        else:
+            cloudinary.uploader.destroy(asset_id)  # 같은 사진이 이미 있음 -> 새로 올린 건 지움
+    except Exception as e:
+        print(f"업로드 정리 실패 ({asset_id}): {e}")  # 남은 건 collect_abandoned_uploads 가 지움
+
+
+def _not_uploaded():
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="업로드된 파일을 찾을 수 없습니다.")
+
+
+def _finalize_local(db: Session, asset_id: str):
+    # upload_server.py 가 받으면서 계산해 둔 해시/크기/형식 (파일 본문은 읽지 않음)
+    path = incoming_path(asset_id)
+    try:
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise _not_uploaded()
+    if not os.path.exists(path):
+        raise _not_uploaded()
+
+    if meta["size"] > MAX_UPLOAD_BYTES:
+        for leftover in (path, path + ".json"):
+            os.remove(leftover)
+        raise _too_large()
+    # 파일은 옮기기만 함 (같은 내용이 이미 있으면 기존 것을 씀, 남은 incoming 파일은 commit 뒤에 지움)
+    return _acquire(db, meta["sha256"], meta["size"], meta["content_type"], meta["ext"], "LOCAL", path)
+
+
+def _restore_incoming(db: Session, asset_id: str):
+    """완료가 롤백됐을 때 저장소로 옮긴 파일을 incoming 으로 되돌림 (다른 요청이 같은 파일을 등록했으면 복사)"""
+    path = incoming_path(asset_id)
+    try:
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        stored = _local_path(meta["sha256"], meta["ext"])
+        if os.path.exists(path) or not os.path.exists(stored):
+            return
+        if db.get(models.Blob, meta["sha256"]) is None:
+            os.replace(stored, path)
+        else:
+            shutil.copyfile(stored, path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"업로드 파일 되돌리기 실패 ({asset_id}): {e}")
+
+
+def _finalize_cloudinary(db: Session, asset_id: str):
+    try:
+        resource = cloudinary.api.resource(asset_id)
+    except cloudinary.api.NotFound:
+        raise _not_uploaded()
+
+    if resource.get("bytes", 0) > MAX_UPLOAD_BYTES:
+        cloudinary.uploader.destroy(asset_id)
+        raise _too_large()
+    if resource.get("resource_type") != "image" or resource.get("format") not in ALLOWED_FORMATS:
+        cloudinary.uploader.destroy(asset_id)
+        raise _not_image()
+
+    # Cloudinary 는 SHA-256 대신 MD5(etag)를 알려줌 -> 키 앞에 표시해서 같은 테이블에 저장
+    # 같은 사진이 이미 있으면 기존 것을 씀 (새로 올린 건 finalize 가 commit 뒤에 지움)
+    key = f"md5:{resource['etag']}"
+    blob = db.get(models.Blob, key, with_for_update=True)
+    if blob is not None:
+        return _add_ref(db, blob)
+
+    blob = models.Blob(
+        sha256=key, size=resource["bytes"], content_type=ALLOWED_FORMATS[resource["format"]],
+        storage="CLOUDINARY", storage_key=asset_id, url=resource["secure_url"], ref_count=1,
+    )
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # 같은 사진이 동시에 완료된 경우: 먼저 들어간 행을 씀
+        blob = db.get(models.Blob, key, with_for_update=True, populate_existing=True)
+        return _add_ref(db, blob)
+    return blob
+